@@ -0,0 +1,81 @@
+// looks pots up in the static catalog written by totk_cook_catalog.py, and only starts the Python simulator when a pot isn't in it
+
+// (loadCatalogIndex is shared with Dropdown.js, with no catalog deployed everything goes through the simulator)
+
+let simulatorLoading = null;
+
+async function catalogKey(actors) {
+    // same key as catalog_key in totk_cook_catalog.py: SHA-1 of the sorted actor names joined with '+'
+    const data = new TextEncoder().encode([...actors].sort().join('+'));
+    const digest = await crypto.subtle.digest('SHA-1', data);
+    return Array.from(new Uint8Array(digest), byte => byte.toString(16).padStart(2, '0')).join('');
+}
+
+async function catalogLookup(materials) {
+    const index = await loadCatalogIndex();
+    if (!index || materials.length === 0 || materials.length > index.max_size) {
+        return null;
+    }
+    const actors = [];
+    for (const material of materials) {
+        if (!(material in index.names)) {
+            return null;
+        }
+        actors.push(index.names[material]);
+    }
+    const key = await catalogKey(actors);
+    try {
+        const shard = await fetchJson(`./Catalog/shards/${key.slice(0, index.prefix_length)}.json`);
+        return shard[key] || null;
+    } catch (error) {
+        return null;
+    }
+}
+
+function loadSimulator() {
+    // PyScript is only downloaded the first time a pot isn't found in the catalog
+    if (simulatorLoading === null) {
+        simulatorLoading = new Promise(resolve => {
+            window.addEventListener('totk-simulator-ready', () => resolve(), { once: true });
+            const core = document.createElement('script');
+            core.type = 'module';
+            core.src = 'https://pyscript.net/releases/2024.8.2/core.js';
+            document.head.appendChild(core);
+            const main = document.createElement('script');
+            main.type = 'py';
+            main.src = './SiteAssets/main.py';
+            main.setAttribute('config', './pyscript.toml');
+            document.head.appendChild(main);
+        });
+    }
+    return simulatorLoading;
+}
+
+async function cook() {
+    const output = document.getElementById('outputText');
+    const materials = [];
+    for (let i = 1; i <= 5; i++) {
+        const value = document.getElementById(`item${i}`).value;
+        if (value !== '') {
+            materials.push(value);
+        }
+    }
+
+    if (materials.length === 0) {
+        // nothing to cook, no need for the simulator
+        output.textContent = 'Material list is empty.';
+        return;
+    }
+
+    const result = await catalogLookup(materials);
+    if (result) {
+        output.textContent = Object.entries(result).map(([k, v]) => `${k}: ${v}\n`).join('');
+        return;
+    }
+
+    output.textContent = 'Loading simulator...';
+    await loadSimulator();
+    output.textContent = window.totkCook(materials);
+}
+
+document.getElementById('cook').addEventListener('click', cook);
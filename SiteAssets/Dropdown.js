@@ -18,6 +18,16 @@ async function fetchJson(url) {
     }
 }
 
+let catalogIndex = null;
+
+function loadCatalogIndex() {
+    // index of the static catalog written by totk_cook_catalog.py, fetched once, resolves to null if no catalog is deployed
+    if (catalogIndex === null) {
+        catalogIndex = fetchJson('./Catalog/index.json').catch(() => null);
+    }
+    return catalogIndex;
+}
+
 function createDropdown(options, id) {
     const selectElement = document.getElementById(id);
 
@@ -29,29 +39,43 @@ function createDropdown(options, id) {
     });
 }
 
-async function makeMatDropdown(id) {
+async function materialNames() {
+    // the catalog index holds the material names, the data files are only fetched when there is no catalog
+    const index = await loadCatalogIndex();
+    if (index && index.dropdown) {
+        return index.dropdown;
+    }
+
     const MaterialData = await fetchJson('./Data/MaterialData.json');
     const LanguageData = await fetchJson('./Data/LanguageData.json');
     const lang = "USen";
 
-    let options = [''];
+    let names = [];
 
     for (let i = 0; i < MaterialData.length; ++i) {
         const key = MaterialData[i];
         const actorName = key["ActorName"];
         const nameKey = `${actorName}_Name`;
-        options.push(LanguageData["Material"][nameKey][lang]);
+        // same fallback as totk_cook_catalog.material_name, materials the language data doesn't name go by their actor name
+        names.push((LanguageData["Material"][nameKey] || {})[lang] || actorName);
     };
 
-    createDropdown(options, id);
+    return names;
+}
+
+async function makeMatDropdowns(ids) {
+    const options = [''].concat(await materialNames());
+    ids.forEach(id => createDropdown(options, id));
 };
 
 const container = document.getElementById('items');
+const dropdownIds = [];
 
 for (let i = 1; i <= 5; i++) {
     const select = document.createElement('select');
     select.id = `item${i}`;
     select.className = "entry"
     container.appendChild(select);
-    makeMatDropdown(select.id);
-}
\ No newline at end of file
+    dropdownIds.push(select.id);
+}
+makeMatDropdowns(dropdownIds);
@@ -1,25 +1,24 @@
 from totk_cook_logic import TotKCookSim, InvalidMaterialException, EmptyMaterialListException
-from pyscript import when, display
-from pyscript.web import page 
+from pyscript import window
+from pyodide.ffi import create_proxy
 
-@when("click", page["#cook"])
-def my_button_click_handler(event):
-    materials = []
-    for i in range(5):
-        val = page[f"#item{i+1}"].value[0]
-        if val != '':
-            materials.append(val)
+sim = TotKCookSim()
 
-    sim = TotKCookSim()
+def cook(materials):
+    # called by Catalog.js when a pot isn't in the static catalog
+    materials = [i for i in materials.to_py() if i != '']
     output = ""
     try:
         result = sim.cook(materials)
         for k, v in result.items():
             output += f'{k}: {v}\n'
-        display(output, target="outputText", append=False)
+        return output
     except EmptyMaterialListException:
-        display('Material list is empty.', target="outputText", append=False)
+        return 'Material list is empty.'
     except InvalidMaterialException:
-        display('Invalid material detected.', target="outputText", append=False)
+        return 'Invalid material detected.'
     except Exception:
-        display('Something went wrong.', target="outputText", append=False)
\ No newline at end of file
+        return 'Something went wrong.'
+
+window.totkCook = create_proxy(cook)
+window.dispatchEvent(window.Event.new('totk-simulator-ready'))
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# the modules live at the root of the repository, next to the Data directory
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
@@ -0,0 +1,292 @@
+# checks of the simulator modules against the data of the repository (run with python -m pytest)
+
+import os
+import random
+
+import pytest
+
+from totk_cook_logic import TotKCookSim
+from totk_cook_outcome import OUTCOME_TABLE
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Data')
+
+@pytest.fixture(scope = 'module')
+def sim():
+
+    return TotKCookSim(DATA_DIR)
+
+# outcome table (totk_cook_outcome.py) against the if/elif chains it replaced
+
+def _legacy_outcome(sim, effect, effect_level, effect_time, hitpoint_recover, monster_extract):
+
+    """Transcription of the if/elif chains of the former TotKCookSim._monster_extract and TotKCookSim._critical, returns the flags
+    they set and the possibilities they stored (in self._tmp['Monster Extract'] or self._tmp['Critical'])."""
+
+    life_ssav = sim.effect['LifeRecover'].get('SuperSuccessAddVolume')
+    flags = set()
+    possibilities = {}
+    if monster_extract:
+        flags.add('monster_extract')
+        if effect != None and effect_time > 0:
+            flags.add('monster_extract_time')
+            possibilities['EffectTime'] = [60, 600, 1800]
+        if (hitpoint_recover == 0 and effect != None) or effect == 'LifeMaxUp':
+            flags.add('monster_extract_only_level')
+            possibilities['EffectLevel'] = [sim.effect[effect].get('MinLv'), effect_level, effect_level + sim.effect[effect].get('SuperSuccessAddVolume')]
+        elif (hitpoint_recover == 0 and effect == None):
+            flags.add('monster_extract_only_health_up')
+            possibilities['HitPointRecover'] = hitpoint_recover + life_ssav
+        elif effect != None:
+            flags.add('monster_extract_health_level_random')
+            possibilities['HitPointRecover'] = [1, hitpoint_recover, hitpoint_recover + life_ssav]
+            possibilities['EffectLevel'] = [sim.effect[effect].get('MinLv'), effect_level, effect_level + sim.effect[effect].get('SuperSuccessAddVolume')]
+        else:
+            flags.add('monster_extract_only_health_random')
+            possibilities['HitPointRecover'] = [1, hitpoint_recover, hitpoint_recover + life_ssav]
+        return flags, possibilities
+
+    flags.add('critical')
+    if effect_level <= 1.0:
+        effect_level = 1.0
+    health = [hitpoint_recover, hitpoint_recover + life_ssav]
+    time = [effect_time, effect_time + sim.system_data.get('SuperSuccessAddEffectiveTime')]
+    if effect != None:
+        level = [effect_level, effect_level + sim.effect[effect].get('SuperSuccessAddVolume')]
+    if effect == None:
+        flags.add('critical_only_health')
+        possibilities['HitPointRecover'] = health
+    elif effect == "LifeMaxUp":
+        flags.add('critical_only_level')
+        possibilities['EffectLevel'] = level
+    elif effect in ['StaminaRecover', 'ExStaminaMaxUp']:
+        if effect_level >= sim.effect[effect].get('MaxLv'):
+            flags.add('critical_only_health')
+            possibilities['HitPointRecover'] = health
+        else:
+            flags.add('critical_health_level')
+            possibilities['HitPointRecover'] = health
+            possibilities['EffectLevel'] = level
+    elif effect_level >= sim.effect[effect].get('MaxLv'):
+        if hitpoint_recover >= sim.effect['LifeRecover'].get('MaxLv'):
+            flags.add('critical_only_time')
+            possibilities['EffectTime'] = time
+        else:
+            flags.add('critical_health_time')
+            possibilities['HitPointRecover'] = health
+            possibilities['EffectTime'] = time
+    elif hitpoint_recover >= sim.effect['LifeRecover'].get('MaxLv'):
+        flags.add('critical_level_time')
+        possibilities['EffectLevel'] = level
+        possibilities['EffectTime'] = time
+    else:
+        flags.add('critical_health_level_time')
+        possibilities['HitPointRecover'] = health
+        possibilities['EffectLevel'] = level
+        possibilities['EffectTime'] = time
+    return flags, possibilities
+
+def _legacy_adjustments(flags):
+
+    """Transcription of the flag tests of the former TotKCookSim._spice and TotKCookSim._bonus, returns the properties whose
+    possibilities the spices adjusted (clamping and the RNG text tested the same flags), and whether the duration possibilities got
+    the recipe BonusTime."""
+
+    adjusted = set()
+    if flags & {'critical_health_level', 'critical_health_level_time', 'critical_health_time', 'critical_only_health',
+                'monster_extract_health_level_random', 'monster_extract_only_health_random'}:
+        adjusted.add('HitPointRecover')
+    if flags & {'critical_only_time', 'critical_health_time', 'critical_health_level_time', 'critical_level_time', 'monster_extract_time'}:
+        adjusted.add('EffectTime')
+    if flags & {'critical_only_level', 'critical_health_level', 'critical_health_level_time', 'critical_level_time',
+                'monster_extract_health_level_random', 'monster_extract_only_level'}:
+        adjusted.add('EffectLevel')
+    bonus_time = bool(flags & {'monster_extract_time', 'critical_only_time', 'critical_health_time', 'critical_health_level_time'})
+    return adjusted, bonus_time
+
+def _outcome_mismatches(sim, meal, monster_extract):
+
+    """Looks up the outcome of a meal (Effect, EffectLevel, EffectTime, HitPointRecover) the way the simulator does, and returns what
+    differs from the former if/elif chains (flags, possibilities, adjusted properties, BonusTime)."""
+
+    flags, possibilities = _legacy_outcome(sim, meal['Effect'], meal['EffectLevel'], meal['EffectTime'], meal['HitPointRecover'], monster_extract)
+    adjusted, bonus_time = _legacy_adjustments(flags)
+    sim._tmp = dict(meal)
+    sim._set_outcome(monster_extract)
+    outcome = sim._outcome
+    mismatches = []
+    if set(outcome.flags) != flags:
+        mismatches.append(f'flags {sorted(outcome.flags)} != {sorted(flags)}')
+    if sim._tmp[outcome.source] != possibilities:
+        mismatches.append(f'possibilities {sim._tmp[outcome.source]} != {possibilities}')
+    if outcome.adjusted != adjusted:
+        mismatches.append(f'adjusted {sorted(outcome.adjusted)} != {sorted(adjusted)}')
+    if outcome.bonus_time != bonus_time:
+        mismatches.append(f'bonus_time {outcome.bonus_time} != {bonus_time}')
+    return outcome, mismatches
+
+def test_outcome_table_keys(sim):
+
+    # every key of the table, with a meal built to fall on it
+    effects = {None: None, 'LifeMaxUp': 'LifeMaxUp', 'Stamina': 'StaminaRecover', 'Other': 'AttackUp'}
+    max_hitpoint_recover = sim.effect['LifeRecover'].get('MaxLv')
+    mismatches = []
+    for key, outcome in OUTCOME_TABLE.items():
+        kind, level_maxed, hearts_maxed, hearts_zero, timed, monster_extract = key
+        if hearts_maxed and hearts_zero:
+            # can't both be true, the key is never looked up
+            continue
+        effect = effects[kind]
+        if effect is None and (level_maxed or timed):
+            # meals without effect have no level nor duration
+            continue
+        meal = {
+            'Effect': effect,
+            'EffectLevel': sim.effect[effect].get('MaxLv') if level_maxed else (2 if effect is not None else 0),
+            'EffectTime': 600 if timed else 0,
+            'HitPointRecover': max_hitpoint_recover if hearts_maxed else (0 if hearts_zero else 20)
+        }
+        found, errors = _outcome_mismatches(sim, meal, monster_extract)
+        if found is not outcome:
+            errors.append('meal looked up another key')
+        mismatches += [(key, error) for error in errors]
+    assert mismatches == []
+
+def test_outcome_table_cooked_meals(sim, monkeypatch):
+
+    # meals of random pots (half of them holding a Monster Extract), as they reach the outcome lookup while cooking
+    meals = []
+    set_outcome = sim._set_outcome
+    def record(monster_extract):
+        meals.append(({name: sim._tmp[name] for name in ['Effect', 'EffectLevel', 'EffectTime', 'HitPointRecover']}, monster_extract))
+        set_outcome(monster_extract)
+    monkeypatch.setattr(sim, '_set_outcome', record)
+    generator = random.Random(0)
+    actors = list(sim.material)
+    for i in range(2000):
+        pot = [generator.choice(actors) for _ in range(generator.randint(1, 5))]
+        if i % 2:
+            pot[0] = sim.system_data['EnemyExtractActorName']
+        sim.cook(pot)
+    monkeypatch.undo()
+    mismatches = []
+    for meal, monster_extract in meals:
+        mismatches += [(meal, error) for error in _outcome_mismatches(sim, meal, monster_extract)[1]]
+    assert meals
+    assert mismatches == []
+
+# static catalog (totk_cook_catalog.py)
+
+def test_catalog_lookups(sim, tmp_path):
+
+    from totk_cook_catalog import INDEX_NAME, CatalogLookup, export_catalog
+    from totk_cook_space import iter_pots, material_actors
+
+    actors = material_actors(sim)[:12] + [sim.system_data['EnemyExtractActorName']]
+    # a small buffer, so that results are appended to the shard files several times
+    count = export_catalog(str(tmp_path), sim, actors, max_size = 3, prefix_length = 1, buffer_size = 50)
+    pots = list(iter_pots(len(actors), 3))
+    assert count == len(pots)
+    assert not [name for name in os.listdir(tmp_path / 'shards') if not name.endswith('.json')]
+
+    catalog = CatalogLookup(str(tmp_path))
+    assert catalog.index['materials'] == actors
+    assert len(catalog.index['dropdown']) == len(material_actors(sim))
+    actor_names = {actor: name for name, actor in catalog.index['names'].items()}
+    for pot in pots:
+        pot_actors = [actors[i] for i in pot]
+        # the page gives materials by name and in any order, do the same
+        names = [actor_names[actor] for actor in reversed(pot_actors)]
+        assert catalog.lookup([catalog.index['names'][name] for name in names]) == sim.cook(names)
+    assert catalog.lookup(['NotAMaterial']) is None
+    assert os.path.exists(tmp_path / INDEX_NAME)
+
+def test_catalog_unnamed_material(sim, tmp_path, monkeypatch):
+
+    from totk_cook_catalog import CatalogLookup, export_catalog
+
+    actor = sim._index_material_name['Apple']
+    # a material the language data doesn't name goes by its actor name
+    monkeypatch.setattr(sim, '_material_names', {key: entry for key, entry in sim._material_names.items() if key != f'{actor}_Name'})
+    export_catalog(str(tmp_path), sim, [actor], max_size = 2)
+    catalog = CatalogLookup(str(tmp_path))
+    assert catalog.index['names'] == {actor: actor}
+    assert actor in catalog.index['dropdown']
+    assert catalog.lookup([actor, actor]) == sim.cook([actor, actor])
+
+# columnar results store (totk_cook_results.py)
+
+@pytest.fixture(scope = 'module')
+def store(sim, tmp_path_factory):
+
+    from totk_cook_results import ResultStore, write_results
+    from totk_cook_space import cook_outcome, material_actors
+
+    path = str(tmp_path_factory.mktemp('results'))
+    # the first materials, and an Extra Hearts material (its meals fully recover health whatever their HitPointRecover)
+    actors = material_actors(sim)[:20]
+    actors += [actor for actor in material_actors(sim) if cook_outcome(sim, [actor])['Effect'] == 'LifeMaxUp'][:1]
+    write_results(path, sim, actors, max_size = 3, chunk_size = 256)
+    return ResultStore(path)
+
+def _query_all_columns(store, filters = (), material_filters = ()):
+
+    """Reference query reading every column of every chunk, returns every matching row."""
+
+    from totk_cook_results import COLUMNS, MATERIAL_COLUMNS
+
+    filters = store._encode_filters(filters)
+    allowed = store._allowed_materials(material_filters)
+    rows = []
+    for chunk in store.manifest['chunks']:
+        columns = store._read_chunk(chunk, COLUMNS)
+        for row in range(chunk['rows']):
+            if any(not op(columns[column][row], value) for column, op, value in filters):
+                continue
+            if allowed is not None and any(columns[name][row] not in allowed for name in MATERIAL_COLUMNS):
+                continue
+            rows.append(store._row(columns, row))
+    return rows
+
+@pytest.mark.parametrize('arguments, columns_per_chunk', [
+    ({'filters': [('level', '>=', 1)], 'order_by': 'hearts'}, 2),
+    ({'filters': [('price', '>', 10)]}, 1),
+    ({'material_filters': [('BuyingPrice', '<=', 20)], 'order_by': 'price'}, 6)
+])
+def test_results_column_reads(store, arguments, columns_per_chunk):
+
+    from totk_cook_results import COLUMNS, ORDER_FIELDS
+
+    # queries read whole only the columns their filters and order need, the other columns for the returned rows only
+    chunk_count = len(store.manifest['chunks'])
+    store.column_reads = 0
+    store.value_reads = 0
+    rows = store.query(k = 5, **arguments)
+    assert store.column_reads <= columns_per_chunk * chunk_count
+    assert store.column_reads % columns_per_chunk == 0
+    assert store.value_reads <= len(rows) * len(COLUMNS)
+    # the rows have to be rows a full read matches, with the same top values (rows with equal values can come in any order)
+    matching = _query_all_columns(store, arguments.get('filters', ()), arguments.get('material_filters', ()))
+    assert len(rows) == min(5, len(matching))
+    assert all(row in matching for row in rows)
+    order_by = arguments.get('order_by')
+    if order_by:
+        field = ORDER_FIELDS[order_by]
+        assert [row[field] for row in rows] == sorted((row[field] for row in matching), reverse = True)[:5]
+
+def test_results_no_rows(store):
+
+    assert store.query(k = 0) == []
+    assert store.query(order_by = 'hearts', k = 0) == []
+    assert len(store.query(k = 1)) == 1
+
+def test_results_hearts(sim, store):
+
+    from totk_cook_space import cook_outcome, objective_value
+
+    # the hearts column ranks like the hearts objective, Extra Hearts meals included
+    rows = _query_all_columns(store)
+    assert any(row['Effect'] == 'LifeMaxUp' and row['Hearts'] != row['HitPointRecover'] for row in rows)
+    for row in rows[::7]:
+        outcome = cook_outcome(sim, row['Materials'])
+        assert row['Hearts'] == objective_value(outcome, 'hearts')
+        assert row['HitPointRecover'] == outcome['HitPointRecover']
@@ -0,0 +1,215 @@
+# statistics over the cooking space (meals, effect levels, failures, CookSpice fallbacks, prices), map-reduce style: the pot space is
+# split in shards (pots of a given size whose first material is a given one), each shard is cooked by a worker process into a small
+# mergeable aggregate, and the aggregates are merged as they come back, so no pot result is ever kept
+
+import argparse
+import itertools
+import json
+import multiprocessing
+
+from totk_cook_logic import TotKCookSim
+from totk_cook_space import MAX_POT_SIZE, cook_outcome, material_actors, pot_count
+
+class PotStats():
+
+    """Mergeable aggregate of cook outcomes. Histograms use buckets of price_bucket rupees and of whole hearts."""
+
+    def __init__(self, price_bucket = 10):
+
+        self.price_bucket = price_bucket
+        self.pots = 0
+        self.failures = 0
+        self.spice_fallbacks = 0
+        # ResultActorName -> pots
+        self.meals = {}
+        # CureEffectType -> effect level -> pots
+        self.effect_levels = {}
+        # lowest price of the bucket -> pots
+        self.prices = {}
+        # whole hearts -> pots
+        self.hearts = {}
+
+    def add(self, outcome, spice_fallback = False):
+
+        """Adds a cook outcome (see totk_cook_space.cook_outcome)."""
+
+        self.pots += 1
+        self.failures += outcome['CookFailure']
+        self.spice_fallbacks += spice_fallback
+        meal = outcome['ResultActorName']
+        self.meals[meal] = self.meals.get(meal, 0) + 1
+        if outcome['Effect'] is not None:
+            levels = self.effect_levels.setdefault(outcome['Effect'], {})
+            level = int(outcome['EffectLevel'])
+            levels[level] = levels.get(level, 0) + 1
+        price = outcome['SellingPrice'] // self.price_bucket * self.price_bucket
+        self.prices[price] = self.prices.get(price, 0) + 1
+        hearts = int(outcome['HitPointRecover'] // 4)
+        self.hearts[hearts] = self.hearts.get(hearts, 0) + 1
+
+    def merge(self, other):
+
+        """Adds the pots of another aggregate (with the same price buckets) to this one."""
+
+        self.pots += other.pots
+        self.failures += other.failures
+        self.spice_fallbacks += other.spice_fallbacks
+        for meal, count in other.meals.items():
+            self.meals[meal] = self.meals.get(meal, 0) + count
+        for effect, other_levels in other.effect_levels.items():
+            levels = self.effect_levels.setdefault(effect, {})
+            for level, count in other_levels.items():
+                levels[level] = levels.get(level, 0) + count
+        for price, count in other.prices.items():
+            self.prices[price] = self.prices.get(price, 0) + count
+        for hearts, count in other.hearts.items():
+            self.hearts[hearts] = self.hearts.get(hearts, 0) + count
+
+    def to_dict(self):
+
+        # JSON keys are strings, so numeric keys are stored as pairs
+        return {
+            'price_bucket': self.price_bucket,
+            'pots': self.pots,
+            'failures': self.failures,
+            'spice_fallbacks': self.spice_fallbacks,
+            'meals': self.meals,
+            'effect_levels': {effect: sorted(levels.items()) for effect, levels in self.effect_levels.items()},
+            'prices': sorted(self.prices.items()),
+            'hearts': sorted(self.hearts.items())
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+
+        stats = cls(data['price_bucket'])
+        stats.pots = data['pots']
+        stats.failures = data['failures']
+        stats.spice_fallbacks = data['spice_fallbacks']
+        stats.meals = dict(data['meals'])
+        stats.effect_levels = {effect: dict((level, count) for level, count in levels) for effect, levels in data['effect_levels'].items()}
+        stats.prices = dict((price, count) for price, count in data['prices'])
+        stats.hearts = dict((hearts, count) for hearts, count in data['hearts'])
+        return stats
+
+def _spice_fallback(sim, materials):
+
+    """Returns whether the pot just cooked got its recipe from the CookSpice fallback to single recipes."""
+
+    # the fallback needs a CookSpice material among 2+ different cooktags, the trace is only paid for those pots
+    tags = set(material['CookTag'] for material in materials)
+    if 'CookSpice' not in tags or len(tags) < 2:
+        return False
+    return sim._trace()['Recipe']['CookSpice fallback']
+
+def iter_shards(material_count, max_size = MAX_POT_SIZE):
+
+    """Yields the shards of the pot space, as (size, first material index)."""
+
+    for size in range(1, max_size + 1):
+        for first in range(material_count):
+            yield (size, first)
+
+def iter_shard_pots(material_count, shard):
+
+    """Yields the canonical pots of a shard: pots of the shard size whose lowest material index is the shard first material."""
+
+    size, first = shard
+    for rest in itertools.combinations_with_replacement(range(first, material_count), size - 1):
+        yield (first,) + rest
+
+def shard_stats(sim, actors, shard, price_bucket = 10):
+
+    """Cooks every pot of a shard (materials are indices in actors) and returns their aggregate."""
+
+    stats = PotStats(price_bucket)
+    for pot in iter_shard_pots(len(actors), shard):
+        materials = [actors[i] for i in pot]
+        outcome = cook_outcome(sim, materials)
+        stats.add(outcome, _spice_fallback(sim, sim._tmp['Materials']))
+    return stats
+
+# state of worker processes, set by _init_worker
+_worker = {}
+
+def _init_worker(data_dir, actors, price_bucket):
+
+    _worker['sim'] = TotKCookSim(data_dir)
+    _worker['actors'] = actors
+    _worker['price_bucket'] = price_bucket
+
+def _map_shard(shard):
+
+    return shard_stats(_worker['sim'], _worker['actors'], shard, _worker['price_bucket']).to_dict()
+
+def analyze(materials = None, max_size = MAX_POT_SIZE, data_dir = 'Data', processes = None, price_bucket = 10, progress = None):
+
+    """Computes the statistics of every canonical pot made of the given materials (actor names, all materials if None). Shards are
+    cooked by processes worker processes (one per CPU if None, in this process if 1). progress(pots done, pots total) is called after
+    every shard."""
+
+    actors = material_actors(TotKCookSim(data_dir)) if materials is None else list(materials)
+    total = pot_count(len(actors), max_size)
+    stats = PotStats(price_bucket)
+    shards = iter_shards(len(actors), max_size)
+
+    if processes == 1:
+        _init_worker(data_dir, actors, price_bucket)
+        results = map(_map_shard, shards)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes, _init_worker, (data_dir, actors, price_bucket))
+        results = pool.imap_unordered(_map_shard, shards)
+    try:
+        for result in results:
+            stats.merge(PotStats.from_dict(result))
+            if progress is not None:
+                progress(stats.pots, total)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return stats
+
+def format_report(stats, top = 20):
+
+    """Formats the statistics as a text report."""
+
+    def share(count):
+        return f'{count / stats.pots * 100:6.2f}%' if stats.pots else '     -'
+
+    lines = [
+        f'{stats.pots} pots',
+        f'failures: {stats.failures} ({share(stats.failures).strip()})',
+        f'CookSpice fallbacks: {stats.spice_fallbacks} ({share(stats.spice_fallbacks).strip()})',
+        '',
+        f'meals (top {top}):'
+    ]
+    for meal, count in sorted(stats.meals.items(), key = lambda item: -item[1])[:top]:
+        lines.append(f'  {meal:<40} {count:>12} {share(count)}')
+    lines += ['', 'effect levels:']
+    for effect, levels in sorted(stats.effect_levels.items()):
+        lines.append(f'  {effect}: ' + ', '.join(f'{level}: {count}' for level, count in sorted(levels.items())))
+    lines += ['', f'prices (buckets of {stats.price_bucket}):']
+    for price, count in sorted(stats.prices.items()):
+        lines.append(f'  {price:>6}-{price + stats.price_bucket - 1:<6} {count:>12} {share(count)}')
+    lines += ['', 'hearts:']
+    for hearts, count in sorted(stats.hearts.items()):
+        lines.append(f'  {hearts:>6} {count:>12} {share(count)}')
+    return '\n'.join(lines)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = 'Statistics over the cooking space.')
+    parser.add_argument('--max-size', type = int, default = MAX_POT_SIZE, help = 'maximum amount of materials in a pot')
+    parser.add_argument('--materials', nargs = '*', help = 'only consider pots made of these actor names')
+    parser.add_argument('--data-dir', default = 'Data')
+    parser.add_argument('--processes', type = int, help = 'worker processes, one per CPU by default')
+    parser.add_argument('--price-bucket', type = int, default = 10, help = 'width of the price histogram buckets')
+    parser.add_argument('--output', help = 'file to save the aggregate to, as JSON')
+    args = parser.parse_args()
+
+    stats = analyze(args.materials, args.max_size, args.data_dir, args.processes, args.price_bucket)
+    print(format_report(stats))
+    if args.output:
+        with open(args.output, 'w', encoding = 'UTF-8') as file:
+            json.dump(stats.to_dict(), file, indent = 2)
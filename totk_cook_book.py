@@ -0,0 +1,259 @@
+# recipe book planner: a set of pots that fills every entry of the cooking book (RecipeCardData.json, with one Elixir entry per effect)
+# every cook fills exactly one entry, so filling the book takes one pot per reachable entry and the problem comes down to choosing
+# which pot fills which entry: as cheap as possible (BuyingPrice), and without using more of a material than the inventory holds
+# candidate pots are generated from the recipes themselves (one material per ingredient of the recipe, cheapest combinations first)
+# and from single materials, then cooked to know which entry they really fill
+
+import heapq
+
+from totk_cook_logic import TotKCookSim
+from totk_cook_space import cook_outcome, inventory_counts, material_actors
+
+ELIXIR_ACTOR_NAME = 'Item_Cook_C_17'
+
+def book_entry(outcome):
+
+    """Returns the cooking book entry (as listed in RecipeCardData.json) filled by a cook outcome (see totk_cook_space.cook_outcome)."""
+
+    if outcome['ResultActorName'] == ELIXIR_ACTOR_NAME and outcome['Effect'] is not None:
+        return f"{ELIXIR_ACTOR_NAME}_{outcome['Effect']}"
+    return outcome['ResultActorName']
+
+def _pot_cost(sim, pot):
+
+    return sum(sim.material[actor].get('BuyingPrice', 0) for actor in pot)
+
+def _cheapest_combinations(parts):
+
+    """Yields one material of each part (lists of (cost, actor), cheapest first), the cheapest combinations first. A material can't
+    be used for two parts: recipes match every ingredient with a different material."""
+
+    start = (0,) * len(parts)
+    heap = [(sum(part[0][0] for part in parts), start)]
+    seen = {start}
+    while heap:
+        cost, indices = heapq.heappop(heap)
+        actors = [parts[i][index][1] for i, index in enumerate(indices)]
+        if len(set(actors)) == len(actors):
+            yield actors
+        for i, index in enumerate(indices):
+            if index + 1 < len(parts[i]):
+                successor = indices[:i] + (index + 1,) + indices[i + 1:]
+                if successor not in seen:
+                    seen.add(successor)
+                    heapq.heappush(heap, (cost - parts[i][index][0] + parts[i][index + 1][0], successor))
+
+def book_coverage(sim = None, inventory = None, candidates = 3, patience = 100):
+
+    """Returns cooking book entry -> candidate pots that fill it, cheapest first, as (cost, actor names). Only materials of the
+    inventory (list of materials, or dictionary of material -> amount) are used if given. Pots are generated recipe by recipe, in
+    increasing cost, until patience pots in a row brought nothing new (an entry with less than candidates pots)."""
+
+    sim = TotKCookSim() if sim is None else sim
+    counts = None if inventory is None else inventory_counts(sim, inventory)
+    actors = [actor for actor in material_actors(sim) if counts is None or counts.get(actor, 0) > 0]
+    priced = sorted((sim.material[actor].get('BuyingPrice', 0), actor) for actor in actors)
+
+    coverage = {}
+    tried = set()
+
+    def try_pot(pot):
+        # returns whether the pot was a new candidate for its entry
+        key = tuple(sorted(pot))
+        if key in tried:
+            return False
+        tried.add(key)
+        if counts is not None and any(pot.count(actor) > counts[actor] for actor in set(pot)):
+            return False
+        entry = book_entry(cook_outcome(sim, pot))
+        pots = coverage.setdefault(entry, [])
+        if len(pots) >= candidates:
+            return False
+        pots.append((_pot_cost(sim, pot), list(key)))
+        return True
+
+    # single materials fill the single recipe entries, pairs of cheap materials find the failures
+    for _, actor in priced:
+        try_pot([actor])
+    cheapest = [actor for _, actor in priced[:20]]
+    for i, first in enumerate(cheapest):
+        for second in cheapest[i + 1:]:
+            try_pot([first, second])
+
+    # recipes only look at actor names and cooktags, and the entry then only depends on the effect: materials with the same cooktag
+    # and effect, and that no recipe names, fill the same entries, only the cheapest few of them are tried
+    named = set()
+    for recipe in list(sim.recipes) + list(sim.recipes_single):
+        for and_part in recipe['Recipe'].split(' + '):
+            named.update(and_part.split(' or '))
+
+    def cheapest_of_each_kind(materials):
+        kept = []
+        kinds = {}
+        for cost, actor in materials:
+            material = sim.material[actor]
+            kind = actor if actor in named else (material['CookTag'], material.get('CureEffectType'))
+            kinds[kind] = kinds.get(kind, 0) + 1
+            if kinds[kind] <= candidates:
+                kept.append((cost, actor))
+        return kept
+
+    # recipes: one material for each ingredient (and one more material for single ingredient recipes, which only match pots of 2+
+    # different materials)
+    for recipe in sim.recipes:
+        parts = []
+        for and_part in recipe['Recipe'].split(' + '):
+            tokens = set(and_part.split(' or '))
+            parts.append(cheapest_of_each_kind([(cost, actor) for cost, actor in priced
+                                                if actor in tokens or sim.material[actor]['CookTag'] in tokens]))
+        if len(parts) == 1:
+            parts.append(cheapest_of_each_kind(priced))
+        if any(not part for part in parts):
+            continue
+        stale = 0
+        for pot in _cheapest_combinations(parts):
+            stale = 0 if try_pot(pot) else stale + 1
+            if stale >= patience:
+                break
+
+    for pots in coverage.values():
+        pots.sort()
+    return coverage
+
+def _fits(pot, remaining):
+
+    return all(pot.count(actor) <= remaining.get(actor, 0) for actor in set(pot))
+
+def _use(pot, remaining, amount):
+
+    for actor in pot:
+        remaining[actor] = remaining.get(actor, 0) - amount
+
+def _greedy_plan(entries, coverage, counts):
+
+    """Returns entry -> (cost, pot) filling the entries with the fewest candidates first, each with its cheapest pot that still fits
+    within counts."""
+
+    remaining = dict(counts)
+    chosen = {}
+    for entry in sorted(entries, key = lambda entry: len(coverage[entry])):
+        for cost, pot in coverage[entry]:
+            if _fits(pot, remaining):
+                _use(pot, remaining, 1)
+                chosen[entry] = (cost, pot)
+                break
+    return chosen
+
+def _exact_plan(entries, coverage, counts, budget):
+
+    """Returns entry -> (cost, pot) of the assignment of candidate pots filling the most entries within counts, then the cheapest,
+    and whether the search went through. The search starts from the greedy plan and looks at no more than budget['nodes'] partial
+    assignments (the budget is used up across calls), then returns the best plan found so far."""
+
+    order = sorted(entries, key = lambda entry: len(coverage[entry]))
+    remaining = dict(counts)
+    greedy = _greedy_plan(entries, coverage, counts)
+    best = {'filled': len(greedy), 'cost': sum(cost for cost, _ in greedy.values()), 'chosen': greedy}
+    current = {}
+
+    def bound(i):
+        # entries left that still have a candidate fitting what remains, and the cost of the cheapest of those candidates (filling
+        # all of them is the only way to reach that many entries)
+        fillable = 0
+        cost = 0
+        for entry in order[i:]:
+            for pot_cost, pot in coverage[entry]:
+                if _fits(pot, remaining):
+                    fillable += 1
+                    cost += pot_cost
+                    break
+        return fillable, cost
+
+    def search(i, filled, cost):
+        if budget['nodes'] <= 0:
+            return
+        budget['nodes'] -= 1
+        fillable, cheapest = bound(i)
+        if filled + fillable < best['filled']:
+            return
+        if filled + fillable == best['filled'] and cost + cheapest >= best['cost']:
+            return
+        if i == len(order):
+            best.update(filled = filled, cost = cost, chosen = dict(current))
+            return
+        entry = order[i]
+        for pot_cost, pot in coverage[entry]:
+            if _fits(pot, remaining):
+                _use(pot, remaining, 1)
+                current[entry] = (pot_cost, pot)
+                search(i + 1, filled + 1, cost + pot_cost)
+                del current[entry]
+                _use(pot, remaining, -1)
+        # leaving the entry empty, for the others
+        search(i + 1, filled, cost)
+
+    search(0, 0, 0)
+    return best['chosen'], budget['nodes'] > 0
+
+def plan_recipe_book(sim = None, inventory = None, exact = False, candidates = 3, coverage = None, max_candidates = 24,
+                     max_nodes = 200000):
+
+    """Plans one pot per cooking book entry, as cheap as possible (BuyingPrice) and within the inventory (list of materials, or
+    dictionary of material -> amount) if given. Pots are chosen among the candidates of book_coverage. The greedy plan fills the
+    entries with the fewest candidates first; exact searches the assignments of the candidate pots for the plan filling the most
+    entries, then the cheapest, and while an entry stays empty with all its candidates used up, doubles the candidates of the empty
+    entries (up to max_candidates, unless coverage is given) and searches again. The exact search looks at no more than max_nodes
+    partial assignments in total, after that it keeps the best plan found so far (never worse than the greedy one), and Exact is
+    False. Returns the plan and the entries left empty (Unreachable): the generated pots don't fill them, or the inventory can't hold
+    any of their candidates along with the rest of the plan. Other pots may still fill them."""
+
+    sim = TotKCookSim() if sim is None else sim
+    widen = coverage is None
+    coverage = book_coverage(sim, inventory, candidates) if coverage is None else coverage
+    counts = None if inventory is None else inventory_counts(sim, inventory)
+    entries = [entry for entry in sim.recipe_card_table if coverage.get(entry)]
+
+    complete = True
+    if counts is None:
+        # every entry gets its cheapest pot, nothing is shared
+        chosen = {entry: coverage[entry][0] for entry in entries}
+    elif not exact:
+        chosen = _greedy_plan(entries, coverage, counts)
+    else:
+        budget = {'nodes': max_nodes}
+        while True:
+            chosen, complete = _exact_plan(entries, coverage, counts, budget)
+            # an empty entry whose candidates were cut at candidates may fit with more of them
+            if not complete or not widen or candidates >= max_candidates:
+                break
+            if not any(len(coverage[entry]) >= candidates for entry in entries if entry not in chosen):
+                break
+            candidates = min(candidates * 2, max_candidates)
+            # only the empty entries get more candidates, the search grows with the candidates of every entry
+            wider = book_coverage(sim, inventory, candidates)
+            coverage = {entry: coverage[entry] if entry in chosen else pots for entry, pots in wider.items()}
+            entries = [entry for entry in sim.recipe_card_table if coverage.get(entry)]
+
+    plan = []
+    for entry in sim.recipe_card_table:
+        if entry in chosen:
+            cost, pot = chosen[entry]
+            plan.append({
+                'Entry': entry,
+                'Recipe number': sim.recipe_card_table.index(entry) + 1,
+                'Materials': pot,
+                'Cost': cost,
+                'Meal name': sim.cook(pot)['Meal name']
+            })
+    return {
+        'Pots': plan,
+        'Cost': sum(item['Cost'] for item in plan),
+        'Unreachable': [entry for entry in sim.recipe_card_table if entry not in chosen],
+        'Exact': exact and complete
+    }
+
+if __name__ == "__main__":
+    result = plan_recipe_book()
+    for item in result['Pots']:
+        print(item['Recipe number'], item['Meal name'], item['Materials'], item['Cost'])
+    print(f"{len(result['Pots'])} pots, {result['Cost']} rupees, unreachable: {result['Unreachable']}")
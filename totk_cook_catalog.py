@@ -0,0 +1,129 @@
+# static cookbook catalog for the web page: results of cook for a whole pot space, precomputed and written as small JSON shards
+# a pot is looked up by the SHA-1 of its canonical form (actor names sorted and joined with '+'), the first characters of the hash
+# give the shard file, so the page only has to fetch one small file per lookup (see SiteAssets/Catalog.js)
+# results are streamed to the shard files while cooking, only a bounded number of them is held in memory
+# the catalog isn't committed (/Catalog/ is in .gitignore): it has to be exported next to index.html where the site is deployed, without
+# it the page cooks every pot with the simulator and takes the material names from the data files
+
+import hashlib
+import json
+import os
+
+from totk_cook_logic import TotKCookSim
+from totk_cook_space import MAX_POT_SIZE, iter_pots, material_actors, resolve_material
+
+INDEX_NAME = 'index.json'
+SHARDS_DIR = 'shards'
+# results are appended to a part file per shard, one "key":result line each, and the part files become the shards at the end
+PART_SUFFIX = '.part'
+
+def catalog_key(actors):
+
+    """Returns the catalog key of a pot given by actor names (order doesn't matter)."""
+
+    return hashlib.sha1('+'.join(sorted(actors)).encode('UTF-8')).hexdigest()
+
+def material_name(sim, actor):
+
+    """Returns the name of a material in the simulator's language, its actor name if the language data doesn't name it."""
+
+    return sim._material_names.get(f'{actor}_Name', {}).get(sim.area_lang) or actor
+
+def _flush(shards_dir, pending):
+
+    for prefix, lines in pending.items():
+        with open(os.path.join(shards_dir, prefix + PART_SUFFIX), 'a', encoding = 'UTF-8') as file:
+            file.writelines(lines)
+    pending.clear()
+
+def export_catalog(path = 'Catalog', sim = None, materials = None, max_size = MAX_POT_SIZE, prefix_length = 2, buffer_size = 10000):
+
+    """Cooks every canonical pot made of the given materials (actor names, all materials if None) and writes the results as shards
+    keyed by catalog_key. At most buffer_size results are kept in memory before being appended to the shard files. Returns the
+    number of pots written."""
+
+    sim = TotKCookSim() if sim is None else sim
+    actors = material_actors(sim) if materials is None else list(materials)
+    shards_dir = os.path.join(path, SHARDS_DIR)
+    os.makedirs(shards_dir, exist_ok = True)
+    # shards of a previous export, and part files left by an interrupted one
+    for file_name in os.listdir(shards_dir):
+        if file_name.endswith(PART_SUFFIX) or file_name.endswith('.json'):
+            os.remove(os.path.join(shards_dir, file_name))
+
+    pending = {}
+    count = 0
+    for pot in iter_pots(len(actors), max_size):
+        pot_actors = [actors[i] for i in pot]
+        key = catalog_key(pot_actors)
+        line = f'{json.dumps(key)}:{json.dumps(sim.cook(pot_actors), ensure_ascii = False, separators = (",", ":"))}\n'
+        pending.setdefault(key[:prefix_length], []).append(line)
+        count += 1
+        if count % buffer_size == 0:
+            _flush(shards_dir, pending)
+    _flush(shards_dir, pending)
+
+    # every part file becomes a JSON object, line by line (canonical pots are unique, so are their keys)
+    for file_name in os.listdir(shards_dir):
+        if not file_name.endswith(PART_SUFFIX):
+            continue
+        part_path = os.path.join(shards_dir, file_name)
+        with open(part_path, 'r', encoding = 'UTF-8') as part, \
+             open(part_path[:-len(PART_SUFFIX)] + '.json', 'w', encoding = 'UTF-8') as file:
+            file.write('{')
+            for i, line in enumerate(part):
+                file.write((',' if i else '') + line.rstrip('\n'))
+            file.write('}')
+        os.remove(part_path)
+
+    # the page picks materials by their name, in the simulator's language (resolved like the simulator does, in case two materials
+    # share a name)
+    names = {}
+    for actor in actors:
+        name = material_name(sim, actor)
+        names[name] = resolve_material(sim, name)
+    index = {
+        'prefix_length': prefix_length,
+        'max_size': max_size,
+        'lang': sim.area_lang,
+        'materials': actors,
+        'names': names,
+        # names of every material in MaterialData.json order, for the material dropdowns, so the page doesn't need the data files
+        'dropdown': [material_name(sim, actor) for actor in material_actors(sim)]
+    }
+    with open(os.path.join(path, INDEX_NAME), 'w', encoding = 'UTF-8') as file:
+        json.dump(index, file, ensure_ascii = False, separators = (',', ':'))
+    return count
+
+class CatalogLookup():
+
+    """Looks up pots in a catalog written by export_catalog, loading shards only when needed."""
+
+    def __init__(self, path = 'Catalog'):
+
+        self.path = path
+        with open(os.path.join(path, INDEX_NAME), 'r', encoding = 'UTF-8') as file:
+            self.index = json.loads(file.read())
+        self._shards = {}
+
+    def _shard(self, prefix):
+
+        if prefix not in self._shards:
+            shard_path = os.path.join(self.path, SHARDS_DIR, prefix + '.json')
+            if os.path.exists(shard_path):
+                with open(shard_path, 'r', encoding = 'UTF-8') as file:
+                    self._shards[prefix] = json.loads(file.read())
+            else:
+                self._shards[prefix] = {}
+        return self._shards[prefix]
+
+    def lookup(self, actors):
+
+        """Returns the precomputed output of a pot given by actor names, or None if the pot isn't in the catalog."""
+
+        key = catalog_key(actors)
+        return self._shard(key[:self.index['prefix_length']]).get(key)
+
+if __name__ == "__main__":
+    count = export_catalog(max_size = 2)
+    print(f'{count} pots exported')
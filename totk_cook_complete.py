@@ -0,0 +1,104 @@
+# best completions of a partially filled pot ("I have these 2 materials, what should I add?")
+# candidates are added in decreasing order of what they can bring to the objective, the sum of contributions of the partial pot is
+# computed once and extended one material at a time, and a branch is dropped as soon as its upper bound can't beat the k-th best
+# completion found so far; pots stuck on a failure recipe aren't cooked, unless a failed meal can make it in the top k
+
+import heapq
+
+from totk_cook_logic import EmptyMaterialListException, TotKCookSim
+from totk_cook_space import MAX_POT_SIZE, FailureLock, ObjectiveBound, cook_outcome, inventory_counts, objective_value, resolve_material
+
+def complete(partial, objective = 'hearts', effect = None, inventory = None, k = 10, sim = None, max_size = MAX_POT_SIZE, max_pots = None):
+
+    """Returns the k best ways to fill a partial pot (materials as accepted by cook) for an objective (see totk_cook_space.OBJECTIVES),
+    best first. inventory (list of materials, or dictionary of material -> amount) limits what can be added, anything can be added if
+    None. Effect level and duration are those of effect, by default the effect of the partial pot.
+    The search is exact, but searches that prune badly (a big k, with few ties near the top) can look at millions of pots: max_pots
+    stops the search after looking at that many pots, the results are then the best ones found so far."""
+
+    sim = TotKCookSim() if sim is None else sim
+    partial = [resolve_material(sim, name) for name in partial]
+    slots = max_size - len(partial)
+    if slots <= 0:
+        return []
+
+    if effect is None and objective in ['level', 'duration']:
+        if not partial:
+            raise EmptyMaterialListException('An effect is needed to complete an empty pot')
+        effect = cook_outcome(sim, partial)['Effect']
+    bound = ObjectiveBound(sim, objective, effect)
+
+    counts = None if inventory is None else inventory_counts(sim, inventory)
+    actors = list(sim.material) if counts is None else [actor for actor in sim.material if counts.get(actor, 0) > 0]
+    blocked = {actor for actor in actors if bound.blocks(sim.material[actor])}
+    # best candidates first, so that good completions are found early and the bound of the rest is the contribution of the first one;
+    # materials that block the objective come last, any pot holding them scores at most bound.blocked
+    candidates = sorted(((bound.contribution(sim.material[actor]), actor) for actor in actors), key = lambda item: (item[1] in blocked, -item[0]))
+    base = sum(bound.contribution(sim.material[actor]) for actor in partial)
+    # every completion of a partial pot holding such a material scores at most bound.blocked
+    partial_blocked = any(bound.blocks(sim.material[actor]) for actor in partial)
+    lock = FailureLock(sim)
+
+    # heap of (value, sequence number, added materials), worst on top
+    top = []
+    sequence = 0
+    looked_at = 0
+
+    def search(start, added, total, slots_left, stuck):
+        nonlocal sequence, looked_at
+        for position in range(start, len(candidates)):
+            contribution, actor = candidates[position]
+            if counts is not None and added.count(actor) >= counts[actor]:
+                continue
+            if max_pots is not None and looked_at >= max_pots:
+                return
+            looked_at += 1
+            size = len(partial) + len(added) + 1
+            if actor in blocked or partial_blocked:
+                best_case = bound.blocked
+            else:
+                # this material, then up to as many of the best remaining ones as slots allow (they can only bring less than this one,
+                # or block the objective)
+                best_case = max(bound.cap(total + contribution + more * max(contribution, 0), size + more) for more in range(slots_left))
+                best_case = max(best_case, bound.blocked) if blocked else best_case
+            if len(top) >= k and best_case <= top[0][0]:
+                # later candidates bring even less
+                return
+            pot_added = added + [actor]
+            # only keep this completion if it can make it in the top k by itself, its branch may still be worth exploring otherwise
+            worth_keeping = len(top) < k or (best_case if actor in blocked or partial_blocked else bound.cap(total + contribution, size)) > top[0][0]
+            child_stuck = None
+            if stuck is not None and not lock.can_escape(stuck, actor):
+                # the pot still fails and scores at most bound.blocked, its extensions may not
+                child_stuck = lock.extend(stuck, actor)
+                worth_keeping = worth_keeping and (len(top) < k or bound.blocked > top[0][0])
+            if worth_keeping or (slots_left > 1 and child_stuck is None):
+                value = objective_value(cook_outcome(sim, partial + pot_added), objective, effect)
+                child_stuck = lock.stuck_state()
+                if len(top) < k:
+                    heapq.heappush(top, (value, sequence, pot_added))
+                elif value > top[0][0]:
+                    heapq.heapreplace(top, (value, sequence, pot_added))
+                sequence += 1
+            if slots_left > 1:
+                search(position, pot_added, total + contribution, slots_left - 1, child_stuck)
+
+    stuck = None
+    if partial:
+        cook_outcome(sim, partial)
+        stuck = lock.stuck_state()
+    search(0, [], base, slots, stuck)
+
+    results = []
+    for value, _, added in sorted(top, key = lambda item: (-item[0], item[1])):
+        results.append({
+            'Added': added,
+            'Materials': partial + added,
+            'Value': value,
+            'Output': sim.cook(partial + added)
+        })
+    return results
+
+if __name__ == "__main__":
+    for result in complete(['Apple', 'Hylian Rice'], 'hearts', k = 5):
+        print(result['Value'], result['Materials'], result['Output']['Meal name'])
@@ -0,0 +1,207 @@
+# finds which pots change outcome between two data directories (e.g. vanilla and modded, or two game versions)
+# instead of simulating the whole cooking space twice, the tables are compared first, and only the pots holding a material that is
+# touched by a change (changed material, material with a changed effect, material matching a changed recipe) are simulated again
+
+import argparse
+import difflib
+import itertools
+import json
+
+from totk_cook_logic import TotKCookSim
+from totk_cook_space import MAX_POT_SIZE, cook_outcome
+
+# outcome properties compared between the two versions
+COMPARED_FIELDS = [
+    'ResultActorName',
+    'RecipeNumber',
+    'Effect',
+    'EffectLevel',
+    'EffectTime',
+    'HitPointRecover',
+    'SellingPrice',
+    'SuperSuccessRate',
+    'RNG'
+]
+
+def _changed_keys(old, new):
+
+    """Returns the keys of two dictionaries whose values differ (including keys only present in one of them)."""
+
+    return set(key for key in set(old) | set(new) if old.get(key) != new.get(key))
+
+def _recipe_parts(recipe):
+
+    """Returns every actor name and cooktag a recipe string refers to."""
+
+    parts = set()
+    for and_part in recipe['Recipe'].split(' + '):
+        parts.update(and_part.split(' or '))
+    return parts
+
+def _changed_recipes(old, new):
+
+    """Returns the recipes that were added, removed, modified or moved between two recipe lists (recipes are matched in order, so a
+    moved recipe can change the outcome too)."""
+
+    old_keys = [json.dumps(recipe, sort_keys = True) for recipe in old]
+    new_keys = [json.dumps(recipe, sort_keys = True) for recipe in new]
+    changed = []
+    matcher = difflib.SequenceMatcher(None, old_keys, new_keys, autojunk = False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != 'equal':
+            changed += old[i1:i2] + new[j1:j2]
+    return changed
+
+def compare_tables(old_sim, new_sim):
+
+    """Compares the tables of two simulators, and returns what changed between them."""
+
+    changes = {
+        'System': old_sim.system_data != new_sim.system_data,
+        'Materials': sorted(_changed_keys(old_sim.material, new_sim.material)),
+        'Effects': sorted(_changed_keys(old_sim.effect, new_sim.effect)),
+        'Recipes': _changed_recipes(old_sim.recipes, new_sim.recipes),
+        'Single recipes': _changed_recipes(old_sim.recipes_single, new_sim.recipes_single),
+        'Recipe cards': old_sim.recipe_card_table != new_sim.recipe_card_table,
+        'Language': old_sim._language_version != new_sim._language_version
+    }
+    # effects are applied in EffectData.json order, so reordering them touches all of them
+    common = [effect for effect in old_sim.effect if effect in new_sim.effect]
+    if common != [effect for effect in new_sim.effect if effect in old_sim.effect]:
+        changes['Effects'] = sorted(set(old_sim.effect) | set(new_sim.effect))
+    return changes
+
+def affected_materials(old_sim, new_sim, actors, changes):
+
+    """Returns the actors whose presence in a pot may change its outcome, or None if every pot may change."""
+
+    # system data and LifeRecover (used by every critical and Monster Extract) touch every pot
+    if changes['System'] or 'LifeRecover' in changes['Effects']:
+        return None
+
+    recipes = changes['Recipes'] + changes['Single recipes']
+    if changes['Recipe cards']:
+        # only Elixirs get their recipe number from the cooking book table
+        recipes += [recipe for recipe in old_sim.recipes + new_sim.recipes if recipe.get('CookEMedicine', False)]
+    recipe_parts = set()
+    for recipe in recipes:
+        recipe_parts |= _recipe_parts(recipe)
+
+    affected = set(changes['Materials'])
+    for actor in actors:
+        for sim in [old_sim, new_sim]:
+            material = sim.material.get(actor)
+            if material is None:
+                continue
+            if material.get('CureEffectType') in changes['Effects']:
+                affected.add(actor)
+            if actor in recipe_parts or material.get('CookTag') in recipe_parts:
+                affected.add(actor)
+    return affected
+
+def iter_pots_with(affected, others, max_size = MAX_POT_SIZE):
+
+    """Yields every canonical pot (sorted tuple of indices) holding at least one of the affected indices, and only those."""
+
+    affected = sorted(affected)
+    others = sorted(others)
+    for size in range(1, max_size + 1):
+        # split each pot between its affected part (at least one material) and the rest, so that each pot comes up exactly once
+        for affected_count in range(1, size + 1):
+            for affected_part in itertools.combinations_with_replacement(affected, affected_count):
+                for other_part in itertools.combinations_with_replacement(others, size - affected_count):
+                    yield tuple(sorted(affected_part + other_part))
+
+def _outcome(sim, materials):
+
+    """Returns the compared properties of a pot, or None if one of its materials doesn't exist in this version."""
+
+    if any(actor not in sim.material for actor in materials):
+        return None
+    outcome = cook_outcome(sim, materials)
+    outcome['RNG'] = outcome['Output'].get('RNG', '')
+    return {field: outcome[field] for field in COMPARED_FIELDS}
+
+def diff_data(old_dir, new_dir, materials = None, max_size = MAX_POT_SIZE):
+
+    """Compares two data directories and returns the table changes and the list of pots whose outcome differs. materials limits the
+    pots to the given actor names (all materials of both versions if None)."""
+
+    old_sim = TotKCookSim(old_dir)
+    new_sim = TotKCookSim(new_dir)
+    if materials is None:
+        # new order first, then materials that were removed
+        actors = list(new_sim.material) + [actor for actor in old_sim.material if actor not in new_sim.material]
+    else:
+        actors = list(materials)
+
+    changes = compare_tables(old_sim, new_sim)
+    affected = affected_materials(old_sim, new_sim, actors, changes)
+    if affected is None:
+        affected_indices = range(len(actors))
+    else:
+        affected_indices = [i for i, actor in enumerate(actors) if actor in affected]
+    others = [i for i in range(len(actors)) if i not in set(affected_indices)]
+
+    changelog = []
+    simulated = 0
+    for pot in iter_pots_with(affected_indices, others, max_size):
+        pot_materials = [actors[i] for i in pot]
+        old = _outcome(old_sim, pot_materials)
+        new = _outcome(new_sim, pot_materials)
+        simulated += 1
+        if old == new:
+            continue
+        changelog.append({
+            'Materials': pot_materials,
+            'Changed': [field for field in COMPARED_FIELDS if old is None or new is None or old[field] != new[field]],
+            'Old': old,
+            'New': new
+        })
+
+    return {
+        'Changes': changes,
+        'Affected materials': None if affected is None else sorted(affected),
+        'Simulated pots': simulated,
+        'Changelog': changelog
+    }
+
+def format_diff(diff):
+
+    """Formats the result of diff_data as a compact text changelog."""
+
+    changes = diff['Changes']
+    lines = []
+    if changes['System']:
+        lines.append('SystemData changed')
+    if changes['Materials']:
+        lines.append('Materials changed: ' + ', '.join(changes['Materials']))
+    if changes['Effects']:
+        lines.append('Effects changed: ' + ', '.join(changes['Effects']))
+    if changes['Recipes'] or changes['Single recipes']:
+        lines.append(f"Recipes changed: {len(changes['Recipes'])} (single: {len(changes['Single recipes'])})")
+    if changes['Recipe cards']:
+        lines.append('RecipeCardData changed')
+    if changes['Language']:
+        lines.append('LanguageData changed (names are not compared)')
+    lines.append(f"{diff['Simulated pots']} pots simulated, {len(diff['Changelog'])} changed")
+
+    for entry in diff['Changelog']:
+        pot = ' + '.join(entry['Materials'])
+        if entry['Old'] is None:
+            lines.append(f"+ {pot}: {entry['New']['ResultActorName']}")
+        elif entry['New'] is None:
+            lines.append(f"- {pot}: {entry['Old']['ResultActorName']}")
+        else:
+            fields = ', '.join(f"{field} {entry['Old'][field]!r} -> {entry['New'][field]!r}" for field in entry['Changed'])
+            lines.append(f'~ {pot}: {fields}')
+    return '\n'.join(lines)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = 'Lists the pots whose outcome differs between two data directories.')
+    parser.add_argument('old_dir')
+    parser.add_argument('new_dir')
+    parser.add_argument('--max-size', type = int, default = MAX_POT_SIZE, help = 'maximum amount of materials in a pot')
+    parser.add_argument('--materials', nargs = '*', help = 'only consider pots made of these actor names')
+    args = parser.parse_args()
+    print(format_diff(diff_data(args.old_dir, args.new_dir, args.materials, args.max_size)))
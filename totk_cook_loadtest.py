@@ -0,0 +1,362 @@
+# load generator for the cooking hot path: replays a mix of pots against in-process simulators (threads or processes) or against a
+# local HTTP endpoint, for a given concurrency and duration, and records latencies in HDR-style histograms
+# summaries are saved as JSON, so that two versions can be compared with the compare command
+
+import argparse
+import json
+import multiprocessing
+import random
+import threading
+import time
+import urllib.request
+from queue import Empty, Queue
+
+from totk_cook_logic import TotKCookSim
+from totk_cook_space import MAX_POT_SIZE, material_actors
+
+# percentiles reported in summaries
+PERCENTILES = [50, 90, 95, 99, 99.9]
+
+class InvalidMixException(Exception):
+    pass
+
+class LoadTestException(Exception):
+    pass
+
+class LatencyHistogram():
+
+    """Log-linear histogram of integer values (microseconds): values are grouped by power of two, and each power of two is split in
+    2 ** (precision_bits - 1) buckets, so every recorded value is known within 2 ** -(precision_bits - 1) of its real value."""
+
+    def __init__(self, precision_bits = 7):
+
+        self.precision_bits = precision_bits
+        self.buckets = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _bucket(self, value):
+
+        shift = max(0, value.bit_length() - self.precision_bits)
+        return (shift << self.precision_bits) | (value >> shift)
+
+    def _bucket_value(self, bucket):
+
+        """Highest value of a bucket (percentiles are never under-reported)."""
+
+        shift, sub = bucket >> self.precision_bits, bucket & ((1 << self.precision_bits) - 1)
+        return ((sub + 1) << shift) - 1
+
+    def record(self, value):
+
+        value = max(0, int(value))
+        bucket = self._bucket(value)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+
+        """Adds the values of another histogram (with the same precision) to this one."""
+
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, percentile):
+
+        if not self.count:
+            return 0
+        target = max(1, -(-self.count * percentile // 100))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= target:
+                return min(self._bucket_value(bucket), self.max)
+        return self.max
+
+    def to_dict(self):
+
+        return {
+            'precision_bits': self.precision_bits,
+            'count': self.count,
+            'total': self.total,
+            'min': self.min,
+            'max': self.max,
+            'buckets': [[bucket, count] for bucket, count in sorted(self.buckets.items())]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+
+        histogram = cls(data['precision_bits'])
+        histogram.buckets = {bucket: count for bucket, count in data['buckets']}
+        histogram.count = data['count']
+        histogram.total = data['total']
+        histogram.min = data['min']
+        histogram.max = data['max']
+        return histogram
+
+def parse_mix(mix):
+
+    """Parses a mix such as 'real:0.7,uniform:0.2,worst:0.1' into a dictionary of kind -> weight."""
+
+    weights = {}
+    for part in mix.split(','):
+        kind, _, weight = part.partition(':')
+        kind = kind.strip()
+        if kind not in PotSampler.KINDS:
+            raise InvalidMixException(f'Unknown pot kind: {kind}')
+        weights[kind] = float(weight) if weight else 1.0
+    return weights
+
+class PotSampler():
+
+    """Draws pots for the load test:
+    - real: materials drawn by popularity (a Zipf law over materials, cheapest first), or pots replayed from a file
+    - uniform: every material equally likely, which defeats caches
+    - worst: pots that match no recipe at all, so that the whole recipe list is scanned before falling back to the failure meal
+    Workers cycle through a fixed set of drawn pots, so with the recipe memo on (see TotKCookSim.recipe_memo_size) most cooks after
+    the first pass are memo hits: uniform and worst pots only measure the recipe scan with the memo disabled."""
+
+    KINDS = ['real', 'uniform', 'worst']
+
+    def __init__(self, sim, mix, seed = 0, replay = None, worst_pool_size = 256, worst_attempts = 1000):
+
+        self._random = random.Random(seed)
+        self._kinds = list(mix)
+        self._weights = [mix[kind] for kind in self._kinds]
+        self._actors = material_actors(sim)
+
+        # popularity: cheap materials are the common ones
+        by_price = sorted(self._actors, key = lambda actor: sim.material[actor].get('BuyingPrice', 0))
+        self._popular = by_price
+        self._popular_weights = [1 / (rank + 1) for rank in range(len(by_price))]
+
+        self._replay = None
+        if replay is not None:
+            # list of pots, or of [pot, count] pairs
+            with open(replay, 'r', encoding = 'UTF-8') as file:
+                entries = json.loads(file.read())
+            self._replay = [entry if isinstance(entry[0], str) else entry[0] for entry in entries]
+            self._replay_weights = [1 if isinstance(entry[0], str) else entry[1] for entry in entries]
+
+        self._worst = []
+        if 'worst' in mix:
+            # up to worst_attempts draws per pot of the pool, the pool is smaller if the data has few pots matching no recipe
+            for _ in range(worst_pool_size * worst_attempts):
+                if len(self._worst) >= worst_pool_size:
+                    break
+                pot = self._uniform()
+                if len(set(pot)) < 2:
+                    continue
+                _, trace = sim.cook(pot, trace = True)
+                if trace['Recipe']['Source'] == 'None':
+                    self._worst.append(pot)
+            if not self._worst:
+                raise LoadTestException('No pot matching no recipe found for the worst pots')
+
+    def _uniform(self):
+
+        return [self._random.choice(self._actors) for _ in range(self._random.randint(1, MAX_POT_SIZE))]
+
+    def sample(self):
+
+        kind = self._random.choices(self._kinds, self._weights)[0]
+        if kind == 'uniform':
+            return self._uniform()
+        if kind == 'worst':
+            return self._random.choice(self._worst)
+        if self._replay is not None:
+            return self._random.choices(self._replay, self._replay_weights)[0]
+        return self._random.choices(self._popular, self._popular_weights, k = self._random.randint(1, MAX_POT_SIZE))
+
+def _http_cook(url, timeout):
+
+    """Returns a function that cooks a pot by posting it to a local service."""
+
+    def cook(pot):
+        request = urllib.request.Request(url, data = json.dumps({'materials': pot}).encode('UTF-8'), headers = {'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout = timeout) as response:
+            response.read()
+    return cook
+
+def _worker(config, worker_id, ready, results):
+
+    """Runs one worker: builds its simulator and pots, waits for every other worker to be ready, then cooks for the configured
+    duration. Puts (histogram, request count, error count, elapsed time) in results, or the exception if the setup failed (the
+    barrier is then aborted, so that the other workers stop waiting)."""
+
+    try:
+        sim = TotKCookSim(config['data_dir'], recipe_memo_size = config['recipe_memo_size'])
+        sampler = PotSampler(sim, config['mix'], config['seed'] + worker_id, config['replay'])
+        cook = sim.cook if config['url'] is None else _http_cook(config['url'], config['timeout'])
+        histogram = LatencyHistogram()
+        requests = 0
+        errors = 0
+        # pots are drawn ahead of time so that sampling isn't measured
+        pots = [sampler.sample() for _ in range(4096)]
+        ready.wait(max(0, config['ready_by'] - time.time()))
+    except Exception as error:
+        ready.abort()
+        results.put(error)
+        return
+    start = time.perf_counter()
+    deadline = start + config['duration']
+    while time.perf_counter() < deadline:
+        pot = pots[requests % len(pots)]
+        cook_start = time.perf_counter_ns()
+        try:
+            cook(pot)
+        except Exception:
+            errors += 1
+        histogram.record((time.perf_counter_ns() - cook_start) // 1000)
+        requests += 1
+    results.put((histogram.to_dict(), requests, errors, time.perf_counter() - start))
+
+def run_load(mix = 'real:0.7,uniform:0.2,worst:0.1', concurrency = 4, duration = 10.0, processes = False, url = None, data_dir = 'Data',
+             replay = None, seed = 0, timeout = 5.0, setup_timeout = 120.0, recipe_memo_size = 4096):
+
+    """Runs a load test and returns its summary. With processes, every worker is a process (one simulator each, no shared GIL),
+    otherwise a thread. With url, pots are posted as JSON ({"materials": [...]}) to that endpoint instead of cooked in-process.
+    recipe_memo_size is the size of the recipe memo of in-process simulators, 0 measures every cook without it (see PotSampler).
+    Raises the error of the first worker whose setup failed, or LoadTestException if the workers aren't all ready within
+    setup_timeout seconds or don't report back in time."""
+
+    config = {
+        'mix': parse_mix(mix),
+        'duration': duration,
+        'data_dir': data_dir,
+        'replay': replay,
+        'seed': seed,
+        'url': url,
+        'timeout': timeout,
+        'recipe_memo_size': recipe_memo_size,
+        # wall clock time by which every worker must be set up (shared by processes)
+        'ready_by': time.time() + setup_timeout
+    }
+    # the clock starts once every worker is ready
+    if processes:
+        ready = multiprocessing.Barrier(concurrency)
+        queue = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target = _worker, args = (config, i, ready, queue), daemon = True) for i in range(concurrency)]
+    else:
+        ready = threading.Barrier(concurrency)
+        queue = Queue()
+        workers = [threading.Thread(target = _worker, args = (config, i, ready, queue), daemon = True) for i in range(concurrency)]
+    for worker in workers:
+        worker.start()
+    # a worker reports after its setup, the duration, and one last request
+    deadline = config['ready_by'] + duration + timeout + 10
+    results = []
+    try:
+        for _ in workers:
+            results.append(queue.get(timeout = max(0, deadline - time.time())))
+    except Empty:
+        if processes:
+            for worker in workers:
+                worker.terminate()
+        raise LoadTestException(f'{len(workers) - len(results)} of {len(workers)} workers did not report in time (setup timeout: {setup_timeout} seconds)')
+    for worker in workers:
+        worker.join()
+    failures = [result for result in results if isinstance(result, Exception)]
+    if failures:
+        # workers that only saw the barrier break report BrokenBarrierError, the cause comes from the one that aborted it
+        causes = [failure for failure in failures if not isinstance(failure, threading.BrokenBarrierError)]
+        if causes:
+            raise causes[0]
+        raise LoadTestException(f'workers were not all ready within {setup_timeout} seconds') from failures[0]
+    elapsed = max(result[3] for result in results)
+
+    histogram = LatencyHistogram()
+    requests = 0
+    errors = 0
+    for worker_histogram, worker_requests, worker_errors, _ in results:
+        histogram.merge(LatencyHistogram.from_dict(worker_histogram))
+        requests += worker_requests
+        errors += worker_errors
+
+    return {
+        'mix': config['mix'],
+        'target': url if url is not None else ('processes' if processes else 'threads'),
+        'concurrency': concurrency,
+        'recipe_memo_size': recipe_memo_size if url is None else None,
+        'duration': elapsed,
+        'requests': requests,
+        'errors': errors,
+        'throughput': requests / elapsed if elapsed > 0 else 0,
+        'latency_us': {
+            'min': histogram.min,
+            'mean': histogram.total / histogram.count if histogram.count else 0,
+            **{f'p{percentile:g}': histogram.percentile(percentile) for percentile in PERCENTILES},
+            'max': histogram.max
+        },
+        'histogram': histogram.to_dict()
+    }
+
+def format_summary(summary):
+
+    lines = [
+        f"{summary['target']} x{summary['concurrency']}, {summary['duration']:.1f}s, mix {summary['mix']}, recipe memo {summary.get('recipe_memo_size')}",
+        f"{summary['requests']} requests, {summary['errors']} errors, {summary['throughput']:.0f} cooks/s"
+    ]
+    lines += [f'{name}: {value:.0f} us' for name, value in summary['latency_us'].items() if value is not None]
+    return '\n'.join(lines)
+
+def compare_summaries(old, new):
+
+    """Formats the difference between two summaries (e.g. before and after a change)."""
+
+    lines = [f"{'':>10} {'old':>10} {'new':>10} {'change':>8}"]
+    if old.get('recipe_memo_size') != new.get('recipe_memo_size'):
+        lines.insert(0, f"recipe memo sizes differ ({old.get('recipe_memo_size')} -> {new.get('recipe_memo_size')}), latencies aren't comparable")
+    rows = [('throughput', old['throughput'], new['throughput'])]
+    rows += [(name, old['latency_us'][name], new['latency_us'][name]) for name in new['latency_us'] if name in old['latency_us']]
+    for name, old_value, new_value in rows:
+        if old_value is None or new_value is None:
+            continue
+        change = (new_value - old_value) / old_value * 100 if old_value else 0
+        lines.append(f'{name:>10} {old_value:>10.0f} {new_value:>10.0f} {change:>+7.1f}%')
+    return '\n'.join(lines)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = 'Load test of the cooking simulator.')
+    commands = parser.add_subparsers(dest = 'command', required = True)
+    run_parser = commands.add_parser('run', help = 'run a load test')
+    run_parser.add_argument('--mix', default = 'real:0.7,uniform:0.2,worst:0.1', help = 'pot kinds and weights, e.g. real:0.7,uniform:0.2,worst:0.1')
+    run_parser.add_argument('--concurrency', type = int, default = 4)
+    run_parser.add_argument('--duration', type = float, default = 10.0, help = 'seconds')
+    run_parser.add_argument('--processes', action = 'store_true', help = 'one process per worker instead of one thread')
+    run_parser.add_argument('--url', help = 'local service endpoint to post pots to, instead of cooking in-process')
+    run_parser.add_argument('--data-dir', default = 'Data')
+    run_parser.add_argument('--replay', help = 'JSON list of real-world pots (or [pot, count] pairs) used by the real kind')
+    run_parser.add_argument('--seed', type = int, default = 0)
+    run_parser.add_argument('--recipe-memo-size', type = int, default = 4096, help = 'recipe memo size of in-process simulators, 0 disables it')
+    run_parser.add_argument('--setup-timeout', type = float, default = 120.0, help = 'seconds the workers have to get ready')
+    run_parser.add_argument('--output', help = 'file to save the summary to')
+    compare_parser = commands.add_parser('compare', help = 'compare two saved summaries')
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        summary = run_load(args.mix, args.concurrency, args.duration, args.processes, args.url, args.data_dir, args.replay, args.seed, setup_timeout = args.setup_timeout,
+                           recipe_memo_size = args.recipe_memo_size)
+        print(format_summary(summary))
+        if args.output:
+            with open(args.output, 'w', encoding = 'UTF-8') as file:
+                json.dump(summary, file, indent = 2)
+    else:
+        with open(args.old, 'r', encoding = 'UTF-8') as file:
+            old = json.loads(file.read())
+        with open(args.new, 'r', encoding = 'UTF-8') as file:
+            new = json.loads(file.read())
+        print(compare_summaries(old, new))
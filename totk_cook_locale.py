@@ -0,0 +1,45 @@
+# splits LanguageData.json into one small file per locale with the sections used by the meal output (Data/Locale/USen.json, ...), so
+# that TotKCookSim.cook(..., locale = ...) only reads the strings of the locale it serves (see LocaleStrings in totk_cook_logic.py), and
+# one file with the material names of every locale (Data/Locale/Material.json), the only strings the simulator keeps in memory
+# every file holds the version (hash) of the LanguageData.json it was split from: files have to be split again whenever
+# LanguageData.json changes, outdated split files are ignored until then (the material file also records the size and modification
+# time of LanguageData.json, so that loading the simulator doesn't need to hash it while they match)
+
+import argparse
+import json
+import os
+
+from totk_cook_logic import (LOCALE_DIR, MATERIAL_NAMES_FILE, language_file_stat, language_locales, language_material_names, locale_strings,
+                             read_language_data)
+
+def _write(path, content):
+
+    with open(path, 'w', encoding = 'UTF-8') as file:
+        json.dump(content, file, ensure_ascii = False, separators = (',', ':'))
+
+def split_locales(data_dir = 'Data', locales = None):
+
+    """Writes the string tables of every locale (all locales of the language data if None) and the material names to the Locale
+    directory of data_dir. Returns the paths written."""
+
+    source = language_file_stat(data_dir)
+    version, locale_dict = read_language_data(data_dir)
+    all_locales = language_locales(locale_dict)
+    locales = all_locales if locales is None else locales
+    os.makedirs(os.path.join(data_dir, LOCALE_DIR), exist_ok = True)
+    paths = [os.path.join(data_dir, LOCALE_DIR, MATERIAL_NAMES_FILE)]
+    _write(paths[0], {'Version': version, 'Source': source, 'Locales': all_locales, 'Material': language_material_names(locale_dict)})
+    for locale in locales:
+        path = os.path.join(data_dir, LOCALE_DIR, f'{locale}.json')
+        _write(path, {'Version': version, **locale_strings(locale_dict, locale)})
+        paths.append(path)
+    return paths
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = 'Splits the meal strings of LanguageData.json into one file per locale.')
+    parser.add_argument('--data-dir', default = 'Data')
+    parser.add_argument('--locales', nargs = '*', help = 'locales to split, all of them by default')
+    args = parser.parse_args()
+
+    for path in split_locales(args.data_dir, args.locales):
+        print(f'{path}: {os.path.getsize(path)} bytes')
@@ -4,6 +4,13 @@
 import json
 import math
 import copy
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from totk_cook_outcome import CRITICAL, MONSTER_EXTRACT, NO_OUTCOME, OUTCOME_TABLE, outcome_key
 
 # used multiple times throughout the script (default recipe, clashing effects in elixir, ...)
 FAILURE_RECIPE = {
@@ -12,96 +19,510 @@ FAILURE_RECIPE = {
                     "CookFailure": True
                 }
 
+# every file the simulator reads from its data directory
+DATA_FILES = [
+    'SystemData.json',
+    'RecipeData.json',
+    'SingleRecipeData.json',
+    'RecipeCardData.json',
+    'MaterialData.json',
+    'EffectData.json',
+    'LanguageData.json'
+]
+
+# sections of LanguageData.json used by the meal output, also split into one file per locale in the Locale directory of the data
+# (see totk_cook_locale.py), so that serving a locale only reads its own strings
+LOCALE_SECTIONS = ['Meal', 'Effect', 'Buff']
+LOCALE_DIR = 'Locale'
+# split file of the material names (all locales), the only part of LanguageData.json the simulator keeps in memory
+MATERIAL_NAMES_FILE = 'Material.json'
+
 class EmptyMaterialListException(Exception):
     pass
 
 class InvalidMaterialException(Exception):
     pass
 
+class InvalidProfileException(Exception):
+    pass
+
+class InvalidLocaleException(Exception):
+    pass
+
+def locale_strings(locale_dict, locale):
+
+    """Returns the string tables of one locale (section -> key -> string) from the language data."""
+
+    return {section: {key: entry[locale] for key, entry in locale_dict[section].items() if locale in entry} for section in LOCALE_SECTIONS}
+
+# versions of the LanguageData.json files already hashed: (path, size, modification time) -> version
+_language_versions = {}
+
+def language_file_stat(data_dir):
+
+    """Returns the size and modification time of LanguageData.json, as recorded in the split files."""
+
+    stat = os.stat(os.path.join(data_dir, 'LanguageData.json'))
+    return [stat.st_size, stat.st_mtime_ns]
+
+def _read_language_file(data_dir):
+
+    """Returns the version of LanguageData.json (hash of the file, stored in the split files to tell whether they are up to date) and
+    its content."""
+
+    path = os.path.abspath(os.path.join(data_dir, 'LanguageData.json'))
+    source = language_file_stat(data_dir)
+    with open(path, 'rb') as json_file:
+        data = json_file.read()
+    version = hashlib.sha1(data).hexdigest()
+    _language_versions[(path, *source)] = version
+    return version, data
+
+def language_version(data_dir):
+
+    """Returns the version of LanguageData.json, only hashing the file if it changed since it was last hashed."""
+
+    path = os.path.abspath(os.path.join(data_dir, 'LanguageData.json'))
+    version = _language_versions.get((path, *language_file_stat(data_dir)))
+    if version is None:
+        version = _read_language_file(data_dir)[0]
+    return version
+
+def read_language_data(data_dir):
+
+    """Reads LanguageData.json, returns its version and the language data."""
+
+    version, data = _read_language_file(data_dir)
+    return version, json.loads(data.decode('UTF-8'))
+
+def language_locales(locale_dict):
+
+    """Returns the locales of the language data."""
+
+    return list(next(iter(locale_dict['Meal'].values())))
+
+def language_material_names(locale_dict):
+
+    """Returns the names of the materials (key -> language -> name) of the language data, without the other Material strings."""
+
+    return {key: entry for key, entry in locale_dict['Material'].items() if key.endswith('_Name')}
+
+def read_material_names(data_dir):
+
+    """Returns the version of LanguageData.json, its locales and its material names (see language_material_names), from the split
+    Material file of the data directory if it was split from the same LanguageData.json, else from LanguageData.json itself. The
+    split file also records the size and modification time of the LanguageData.json it was split from: while they match,
+    LanguageData.json isn't read at all, else it is hashed (a copied or checked out file has another modification time but the same
+    version), and only parsed if its version differs."""
+
+    try:
+        with open(os.path.join(data_dir, LOCALE_DIR, MATERIAL_NAMES_FILE), 'r', encoding = 'UTF-8') as json_file:
+            split = json.loads(json_file.read())
+    except (OSError, ValueError):
+        split = {}
+    if 'Version' in split and (split.get('Source') == language_file_stat(data_dir) or split['Version'] == language_version(data_dir)):
+        return split['Version'], split['Locales'], split['Material']
+    version, locale_dict = read_language_data(data_dir)
+    return version, language_locales(locale_dict), language_material_names(locale_dict)
+
+def material_name_index(materials, material_names):
+
+    """Returns the index of material names (name in any language -> actor name) of the materials of MaterialData.json, given the
+    material names of the language data (see language_material_names). Materials without a localized name are only known by their
+    actor name."""
+
+    index = {}
+    for actor_name in materials:
+        names = [name for name in material_names.get(f'{actor_name}_Name', {}).values() if name]
+        for name in names or [actor_name]:
+            index[name] = actor_name
+    return index
+
+class RecipeMemo():
+
+    """Bounded memo of recipe matching: unique (ActorName, CookTag) pairs of a pot, in order of first appearance -> matching recipe
+    (None if none matches). Pots that only differ in amounts share the same key. The least recently used keys are dropped first."""
+
+    # returned by lookup for keys that aren't memoized (None is a valid memoized value)
+    MISSING = object()
+
+    def __init__(self, max_size = 4096):
+
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key):
+
+        recipe = self._entries.get(key, self.MISSING)
+        if recipe is self.MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return recipe
+
+    def store(self, key, recipe):
+
+        if self.max_size <= 0:
+            return
+        self._entries[key] = recipe
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last = False)
+
+    def stats(self):
+
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'max_size': self.max_size}
+
+class LocaleStrings():
+
+    """String tables of the meal output (see LOCALE_SECTIONS), one per locale, loaded on first use from the split file of the data
+    directory, or from LanguageData.json itself if that file is missing or wasn't split from the language data of the given version
+    (see read_language_data). Only the max_size most recently used locales are kept."""
+
+    def __init__(self, data_dir, version, locales, max_size = 4):
+
+        self.data_dir = data_dir
+        self.version = version
+        self.locales = locales
+        self.max_size = max_size
+        self._tables = OrderedDict()
+        self.loads = 0
+
+    def get(self, locale):
+
+        strings = self._tables.get(locale)
+        if strings is not None:
+            self._tables.move_to_end(locale)
+            return strings
+        strings = self._load(locale)
+        self.loads += 1
+        if self.max_size > 0:
+            self._tables[locale] = strings
+            if len(self._tables) > self.max_size:
+                self._tables.popitem(last = False)
+        return strings
+
+    def _load(self, locale):
+
+        if locale not in self.locales:
+            raise InvalidLocaleException(f'Unknown locale: {locale}')
+        path = os.path.join(self.data_dir, LOCALE_DIR, f'{locale}.json')
+        try:
+            with open(path, 'r', encoding = 'UTF-8') as json_file:
+                split = json.loads(json_file.read())
+            if split.get('Version') == self.version:
+                return {section: split[section] for section in LOCALE_SECTIONS}
+        except (OSError, ValueError):
+            pass
+        return locale_strings(read_language_data(self.data_dir)[1], locale)
+
+    def loaded(self):
+
+        """Returns the locales currently kept, least recently used first."""
+
+        return list(self._tables)
+
 class TotKCookSim():
 
-    def __init__(self):
+    def __init__(self, data_dir = 'Data', tables = None, recipe_memo_size = 4096, locale_cache_size = 4):
 
-        """Initialization of the class."""
+        """Initialization of the class. tables can be given to reuse already loaded tables (see totk_cook_shared.py) instead of reading
+        data_dir. recipe_memo_size bounds the memo of recipe matching (see RecipeMemo), 0 disables it. locale_cache_size bounds the
+        string tables kept in memory (see LocaleStrings)."""
 
-        self._load_data()
+        # output locale of cooks that don't ask for one
+        self.area_lang = 'USen'
+
+        self.data_dir = data_dir
+        # held for the whole duration of a cook, so that swapping tables never happens in the middle of one
+        self._tables_lock = threading.Lock()
+        # held while new tables are built and swapped in (reload_data, add_profile, remove_profile), so that none of them works on
+        # tables or profiles another one is replacing; cooks only wait for the swap
+        self._build_lock = threading.Lock()
+        self._watcher = None
+        self._watcher_stop = None
+        self.last_reload_time = 0.0
+        self.last_reload_error = None
+        # named data profiles (see add_profile): name -> data directory, and name -> tables
+        self._profile_dirs = {}
+        self._profiles = {}
+        # recipe matching memo of each profile (None for the simulator's own data), only valid for the tables it was filled with
+        self.recipe_memo_size = recipe_memo_size
+        self._recipe_memos = {None: RecipeMemo(recipe_memo_size)}
+        self._recipe_memo = self._recipe_memos[None]
+
+        if tables is None:
+            self._load_data()
+        else:
+            self._set_tables(tables)
+        # output string tables of each profile (None for the simulator's own data), profiles sharing the language data share them too
+        self.locale_cache_size = locale_cache_size
+        self._locale_strings = {None: LocaleStrings(self.data_dir, self._language_version, self._locales, locale_cache_size)}
+        self._strings = None
+        self._reset_flags()
 
-        # initialize all flags
-        self._monster_extract_time_flag = False
-        self._monster_extract_only_health_up_flag = False
-        self._monster_extract_only_health_random_flag = False
-        self._monster_extract_health_level_random_flag = False
-        self._monster_extract_only_level_flag = False
-        self._monster_extract_flag = False
+    def _reset_flags(self):
 
-        self._critical_only_time_flag = False
-        self._critical_only_health_flag = False
-        self._critical_health_level_flag = False
-        self._critical_health_time_flag = False
-        self._critical_health_level_time_flag = False
-        self._critical_level_time_flag = False
-        self._critical_only_level_flag = False
-        self._critical_flag = False
+        """Resets the Monster Extract and Critical outcome (see totk_cook_outcome.py), it only holds for one cook."""
+
+        self._outcome = NO_OUTCOME
 
     def _load_data(self):
         
         """Loads all relevant data in dicionaries/lists. It's possible to use modded data."""
 
-        # too lazy to make another language :)
-        self.area_lang = 'USen'
+        start = time.perf_counter()
+        self._set_tables(self._read_tables(self.data_dir))
+        self.last_reload_time = time.perf_counter() - start
+
+    def _read_tables(self, data_dir, base = None):
+
+        """Reads the data directory and returns every table (and the indexes derived from them) in a dictionary, without touching the
+        tables currently in use. If base tables are given, data_dir only needs to hold the files that differ from them: the tables of
+        missing files are taken from base (the same objects, not copies)."""
+
+        def read(file_name):
+            with open(os.path.join(data_dir, file_name), 'r', encoding = 'UTF-8') as json_file:
+                return json.loads(json_file.read())
+
+        tables = {}
+
+        def reuse(file_name, *names):
+            # tables of a file missing from an override directory are shared with the base tables
+            if base is None or os.path.exists(os.path.join(data_dir, file_name)):
+                return False
+            for name in names:
+                tables[name] = base[name]
+            return True
 
         # holds cooking system data
-        with open('Data/SystemData.json', 'r', encoding = 'UTF-8') as json_file:
-            self.system_data = json.loads(json_file.read())
+        if not reuse('SystemData.json', 'system_data'):
+            tables['system_data'] = read('SystemData.json')
 
         # holds non-single recipe data
-        with open('Data/RecipeData.json', 'r', encoding = 'UTF-8') as json_file:
-            self.recipes = json.loads(json_file.read())
+        if not reuse('RecipeData.json', 'recipes'):
+            tables['recipes'] = read('RecipeData.json')
 
         # holds single recipe data
-        with open('Data/SingleRecipeData.json', 'r', encoding = 'UTF-8') as json_file:
-            self.recipes_single = json.loads(json_file.read())
+        if not reuse('SingleRecipeData.json', 'recipes_single'):
+            tables['recipes_single'] = read('SingleRecipeData.json')
 
         # holds cooking book data
-        with open('Data/RecipeCardData.json', 'r', encoding = 'UTF-8') as json_file:
-            self.recipe_card_table = json.loads(json_file.read())
+        if not reuse('RecipeCardData.json', 'recipe_card_table'):
+            tables['recipe_card_table'] = read('RecipeCardData.json')
 
         # holds material data
-        self.material = {}
-        with open('Data/MaterialData.json', 'r', encoding = 'UTF-8') as json_file:
-            materials = json.loads(json_file.read())
-            for item in materials:
-                self.material[item['ActorName']] = item
-        
+        if not reuse('MaterialData.json', 'material'):
+            tables['material'] = {}
+            for item in read('MaterialData.json'):
+                tables['material'][item['ActorName']] = item
+
         # holds effect data
-        self.effect = {}
-        with open('Data/EffectData.json', 'r', encoding = "UTF-8") as json_file:
-            effects = json.loads(json_file.read())
-            for item in effects:
-                self.effect[item['EffectType']] = item
-
-        # holds language data
-        self._index_material_name = {}
-        with open('Data/LanguageData.json', 'r', encoding = 'UTF-8') as json_file:
-            self._locale_dict = json.loads(json_file.read())
-            self._index_material_name_ = {}
-            for key, value in self._locale_dict['Material'].items():
-                if key.endswith('_Caption'):
+        if not reuse('EffectData.json', 'effect'):
+            tables['effect'] = {}
+            for item in read('EffectData.json'):
+                tables['effect'][item['EffectType']] = item
+
+        # holds the version, locales and material names of the language data, the strings of the meal output are only read per locale
+        # (see LocaleStrings)
+        if not reuse('LanguageData.json', '_language_version', '_locales', '_material_names'):
+            tables['_language_version'], tables['_locales'], tables['_material_names'] = read_material_names(data_dir)
+
+        # names of the materials of this MaterialData.json, an override adding or dropping materials gets its own index
+        if base is not None and tables['material'] is base['material'] and tables['_material_names'] is base['_material_names']:
+            tables['_index_material_name'] = base['_index_material_name']
+        else:
+            tables['_index_material_name'] = material_name_index(tables['material'], tables['_material_names'])
+
+        return tables
+
+    def _set_tables(self, tables):
+
+        """Makes a dictionary of tables (see _read_tables) the one used by the simulator."""
+
+        self._tables = tables
+        for name, table in tables.items():
+            setattr(self, name, table)
+
+    def reload_data(self, data_dir = None):
+
+        """Reloads the data directory (or switches to another one) without restarting. The new tables are built first, then swapped in
+        once no cook is running, so a cook in progress always finishes with the old tables. Returns the reload time in seconds."""
+
+        with self._build_lock:
+            data_dir = self.data_dir if data_dir is None else data_dir
+            profile_dirs = dict(self._profile_dirs)
+            start = time.perf_counter()
+            # build everything before taking the lock, cooks keep running on the old tables meanwhile
+            tables = self._read_tables(data_dir)
+            # profiles are rebuilt on top of the new tables, so that they keep sharing them
+            profiles = {name: self._read_tables(profile_dir, tables) for name, profile_dir in profile_dirs.items()}
+            locale_strings = {None: LocaleStrings(data_dir, tables['_language_version'], tables['_locales'], self.locale_cache_size)}
+            for name, profile_tables in profiles.items():
+                locale_strings[name] = self._profile_locale_strings(profile_dirs[name], profile_tables, tables, locale_strings[None])
+            with self._tables_lock:
+                # tables and derived indexes are replaced all at once
+                self._set_tables(tables)
+                self._profiles = profiles
+                self._recipe_memos = {name: RecipeMemo(self.recipe_memo_size) for name in [None] + list(profiles)}
+                self._recipe_memo = self._recipe_memos[None]
+                self._locale_strings = locale_strings
+                self.data_dir = data_dir
+        self.last_reload_time = time.perf_counter() - start
+        self.last_reload_error = None
+        return self.last_reload_time
+
+    def _data_mtimes(self):
+
+        """Returns the modification time of every data file (None if missing)."""
+
+        mtimes = {}
+        for file_name in DATA_FILES:
+            try:
+                mtimes[file_name] = os.stat(os.path.join(self.data_dir, file_name)).st_mtime_ns
+            except OSError:
+                mtimes[file_name] = None
+        return mtimes
+
+    def watch_data(self, interval = 1.0, callback = None):
+
+        """Starts watching the data directory in a background thread, and reloads it whenever one of its files changes. callback, if
+        given, is called with the reload time in seconds (or with the exception if the new data couldn't be loaded)."""
+
+        if self._watcher is not None:
+            return
+        self._watcher_stop = threading.Event()
+
+        def watch(stop):
+            mtimes = self._data_mtimes()
+            while not stop.wait(interval):
+                new_mtimes = self._data_mtimes()
+                if new_mtimes == mtimes:
                     continue
-                for al in value.values():
-                    if not al:
-                        continue
-                    self._index_material_name[al] = key.replace('_Name', '')
+                mtimes = new_mtimes
+                try:
+                    result = self.reload_data()
+                except Exception as e:
+                    # most likely a file caught mid-write, keep the old tables and retry on the next change
+                    self.last_reload_error = e
+                    result = e
+                if callback is not None:
+                    callback(result)
+
+        self._watcher = threading.Thread(target = watch, args = (self._watcher_stop,), daemon = True)
+        self._watcher.start()
+
+    def stop_watching(self):
+
+        """Stops the background thread started by watch_data."""
+
+        if self._watcher is None:
+            return
+        self._watcher_stop.set()
+        self._watcher.join()
+        self._watcher = None
+        self._watcher_stop = None
+
+    def add_profile(self, name, data_dir):
+
+        """Loads a named data profile, usable with cook(..., profile = name). data_dir only needs to hold the files that differ from
+        the simulator's own data directory, the tables of the other files are shared with it. Returns the names of the shared tables."""
+
+        with self._build_lock:
+            # a cook of another profile puts that profile's tables in self._tables while it runs, the simulator's own tables are only
+            # in place when no cook is
+            with self._tables_lock:
+                base = self._tables
+                base_strings = self._locale_strings[None]
+            tables = self._read_tables(data_dir, base)
+            with self._tables_lock:
+                self._profile_dirs[name] = data_dir
+                self._profiles[name] = tables
+                self._recipe_memos[name] = RecipeMemo(self.recipe_memo_size)
+                self._locale_strings[name] = self._profile_locale_strings(data_dir, tables, base, base_strings)
+        return [table for table, value in tables.items() if value is base[table]]
+
+    def remove_profile(self, name):
+
+        """Unloads a data profile."""
 
-    def cook(self, materials: list):
+        with self._build_lock, self._tables_lock:
+            if name not in self._profiles:
+                raise InvalidProfileException(f'Unknown profile: {name}')
+            del self._profile_dirs[name]
+            del self._profiles[name]
+            del self._recipe_memos[name]
+            del self._locale_strings[name]
 
-        """Generates meal data for a given material list."""
+    def _profile_locale_strings(self, data_dir, tables, base_tables, base_strings):
+
+        if tables['_language_version'] == base_tables['_language_version']:
+            return base_strings
+        return LocaleStrings(data_dir, tables['_language_version'], tables['_locales'], self.locale_cache_size)
+
+    def profiles(self):
+
+        """Returns the names of the loaded data profiles."""
+
+        return list(self._profiles)
+
+    def recipe_memo_stats(self, profile = None):
+
+        """Returns the hits, misses and size of the recipe matching memo of a profile (the simulator's own data if None)."""
+
+        if profile not in self._recipe_memos:
+            raise InvalidProfileException(f'Unknown profile: {profile}')
+        return self._recipe_memos[profile].stats()
+
+    def locales(self):
+
+        """Returns the locales of the language data."""
+
+        return list(self._locales)
+
+    def cook(self, materials: list, trace = False, profile = None, locale = None):
+
+        """Generates meal data for a given material list. If trace is True, returns (meal data, trace) where trace explains how the
+        meal was computed (see _trace). profile selects a data profile loaded with add_profile, the simulator's own data if None.
+        locale selects the language of the meal strings, area_lang if None."""
 
         if len(materials) == 0:
             raise EmptyMaterialListException('Material list is empty')
-        
+
+        with self._tables_lock:
+            if profile is not None and profile not in self._profiles:
+                raise InvalidProfileException(f'Unknown profile: {profile}')
+            # string tables of the locale, only loaded the first time the locale is asked for
+            self._strings = self._locale_strings[profile].get(self.area_lang if locale is None else locale)
+            if profile is None:
+                return self._cook_traced(materials, trace)
+            # the profile tables are put in place for this cook only
+            tables = self._tables
+            self._set_tables(self._profiles[profile])
+            self._recipe_memo = self._recipe_memos[profile]
+            try:
+                return self._cook_traced(materials, trace)
+            finally:
+                self._set_tables(tables)
+                self._recipe_memo = self._recipe_memos[None]
+
+    def _cook_traced(self, materials: list, trace):
+
+        output = self._cook(materials)
+        if trace:
+            # the trace is rebuilt from the state left by the cook, so that cooking itself never pays for it
+            return output, self._trace()
+        return output
+
+    def _cook(self, materials: list):
+
+        """Runs every cooking step, with the tables already locked in place."""
+
         self._tmp = {}
         self.output = {}
+        self._reset_flags()
         self._material(materials)
         if self._recipe():
             # if match found, proceed
@@ -116,7 +537,7 @@ class TotKCookSim():
                 # if not failure, proceed
                 self._monster_extract()
                 
-                if not self._monster_extract_flag:
+                if self._outcome.source != MONSTER_EXTRACT:
                     # can't get crit if monster extract
                     self._super_success_rate()
                     self._critical()
@@ -137,13 +558,16 @@ class TotKCookSim():
 
     def _material(self, materials: list):
 
-        """Generates a dictionary of the materials."""
+        """Generates a dictionary of the materials. Materials can be given by their name (in any language) or by their actor name."""
 
         materials_list = []
         for i in materials:
-            if not i in self._index_material_name:
+            if i in self._index_material_name:
+                actor_name = self._index_material_name[i]
+            elif i in self.material:
+                actor_name = i
+            else:
                 raise InvalidMaterialException(f'Invalid material: {i}')
-            actor_name = self._index_material_name[i]
             materials_list.append(self.material[actor_name])
         self._tmp['Materials'] = materials_list
         return
@@ -152,8 +576,24 @@ class TotKCookSim():
 
         """Finds the recipe associated with the list of materials. Returns whether or not a matching meal was found."""
 
-        # default recipe (e.g. failure recipe)
-        materials_list = self._tmp['Materials']
+        materials_name_tag = self._name_tag_pairs(self._tmp['Materials'])
+
+        # the match only depends on the unique pairs, pots that only differ in amounts skip the recipe scan
+        key = tuple(materials_name_tag)
+        recipe = self._recipe_memo.lookup(key)
+        if recipe is RecipeMemo.MISSING:
+            recipe = self._match_recipe(materials_name_tag)
+            self._recipe_memo.store(key, recipe)
+
+        if recipe is None:
+            return False
+        self._tmp['Recipe'] = recipe
+        return True
+
+    def _name_tag_pairs(self, materials_list):
+
+        """Returns the unique (ActorName, CookTag) pairs of a list of materials, in order of first appearance."""
+
         materials_name_tag = []
 
         # generate a set of unique object - cooktag pairs
@@ -162,6 +602,11 @@ class TotKCookSim():
             cook_tag = material['CookTag']
             if (actor_name, cook_tag) not in materials_name_tag:
                 materials_name_tag.append((actor_name, cook_tag))
+        return materials_name_tag
+
+    def _match_recipe(self, materials_name_tag):
+
+        """Scans the recipes for a list of unique (ActorName, CookTag) pairs. Returns the matching recipe, or None."""
 
         # if the size of that set is 1, search in the single recipes
         if len(materials_name_tag) == 1:
@@ -178,16 +623,13 @@ class TotKCookSim():
                     material = m_copy[0]
                     # if it matches, then recipe is ok and we return it
                     if or_part == material[0] or or_part == material[1]:
-                        self._tmp['Recipe'] = recipe
-                        return True
+                        return recipe
 
         # else, search in normal recipes
         else:
             for recipe in self.recipes:
                 # make a copy to not lose the original
                 m_copy = copy.copy(materials_name_tag)
-                if recipe['ResultActorName'] == self.system_data['FailActorName']:
-                    self._tmp['Recipe'] = recipe
                 recipe_str = recipe['Recipe']
                 # generate list of needed parts
                 and_parts = recipe_str.split(' + ')
@@ -217,8 +659,7 @@ class TotKCookSim():
                         all_ok = False
                         break
                 if all_ok:
-                    self._tmp['Recipe'] = recipe
-                    return True
+                    return recipe
         
         # if a normal recipe isn't found, game checks if one of the materials have a CookSpice cooktag, and if so, also checks in the single recipes
         unique_material_tags = set([materials_name_tag[i][1] for i in range(len(materials_name_tag))])
@@ -236,16 +677,16 @@ class TotKCookSim():
                     material = m_copy[0]
                     # if it matches, then recipe is ok and we return it
                     if or_part == material[0] or or_part == material[1]:
-                        self._tmp['Recipe'] = recipe
-                        return True
+                        return recipe
             
-        return False
+        return None
     
     def _no_match_found(self):
 
         """Happens if no matching meal was found, and sets the result to the failed meal."""
 
         self._tmp = {
+            "Materials": self._tmp['Materials'],
             "Recipe": FAILURE_RECIPE,
             "Effect": None,
             "EffectLevel": 0,
@@ -379,51 +820,53 @@ class TotKCookSim():
         """Handles Monster Extract shenanigans (mainly starts storing data for all possibilities)"""
 
         materials_list = self._tmp['Materials']
-        effect = self._tmp['Effect']
-        effect_level = self._tmp['EffectLevel']
-        effect_time = self._tmp['EffectTime']
-        hitpoint_recover = self._tmp['HitPointRecover']
 
         # check for monster extract presence
         for mat in materials_list:
             if mat.get("ActorName") == self.system_data['EnemyExtractActorName']:
-                self._monster_extract_flag = True
-
-        if self._monster_extract_flag:
-            # initiate monster extract section
-            self._tmp['Monster Extract'] = {}
-            if effect != None and effect_time > 0:
-                # this always happens as long as the meal has an effect with a duration
-                # sets a time that's either 1:00, 10:00 or 30:00
-                self._monster_extract_time_flag = True
-                self._tmp['Monster Extract']['EffectTime'] = [60, 600, 1800]
-
-            # the following part is a simplified version of what the game does to know what to do with effect level and health recovery when
-            # a monster extract is present in the materials list
-
-            # the self._tmp['Monster Extract'] dictionary is a way to keep track of all possible ways the meal can be affected by, as to not
-            # to touch the true stats of the meal
-
-            if (hitpoint_recover == 0 and effect != None) or effect == 'LifeMaxUp':
-                # if the meal is not regenerative but has an effect, or is a hearty meal, effect level is either set to min or gets SSAV added
-                # at random (50/50) (SSAV = SuperSuccessAddVolume, a property of each effect)
-                self._monster_extract_only_level_flag = True
-                self._tmp['Monster Extract']['EffectLevel'] = [self.effect[effect].get('MinLv'), effect_level, effect_level + self.effect[effect].get('SuperSuccessAddVolume')]
-            elif (hitpoint_recover == 0 and effect == None):
-                # if the meal is not regenerative and has no effect, add SSAV of LifeRecover (e.g. 12) to health recovery
-                # unsure if this can happen at any point
-                self._monster_extract_only_health_up_flag = True
-                self._tmp['Monster Extract']['HitPointRecover'] = hitpoint_recover + self.effect['LifeRecover'].get('SuperSuccessAddVolume')
-            elif effect != None:
-                # if the meal is regenerative and has an effect (that is not hearty), either effect level is touched (either set to min, either gets
-                # SSAV added), either health recovery is set to min (1) or gets SSAV of LifeRecover (3 hearts) to it at random (25/25/25/25)
-                self._monster_extract_health_level_random_flag = True
-                self._tmp['Monster Extract']['HitPointRecover'] = [1, hitpoint_recover, hitpoint_recover + self.effect['LifeRecover'].get('SuperSuccessAddVolume')]
-                self._tmp['Monster Extract']['EffectLevel'] = [self.effect[effect].get('MinLv'), effect_level, effect_level + self.effect[effect].get('SuperSuccessAddVolume')]
-            else:
-                # if the meal is regenerative with no effect, health recovery is either set to min, either gets +3 hearts
-                self._monster_extract_only_health_random_flag = True
-                self._tmp['Monster Extract']['HitPointRecover'] = [1, hitpoint_recover, hitpoint_recover + self.effect['LifeRecover'].get('SuperSuccessAddVolume')]
+                # the self._tmp['Monster Extract'] dictionary is a way to keep track of all possible ways the meal can be affected by, as to
+                # not to touch the true stats of the meal
+                self._set_outcome(True)
+                return
+
+    def _set_outcome(self, monster_extract):
+
+        """Looks up the Critical or Monster Extract outcome of the meal (see totk_cook_outcome.py), and stores the possibilities it
+        generates in self._tmp['Critical'] or self._tmp['Monster Extract']."""
+
+        effect = self._tmp['Effect']
+        effect_level = self._tmp['EffectLevel']
+        hitpoint_recover = self._tmp['HitPointRecover']
+        level_maxed = effect is not None and effect_level >= self.effect[effect].get('MaxLv')
+        hearts_maxed = hitpoint_recover >= self.effect['LifeRecover'].get('MaxLv')
+        key = outcome_key(effect, level_maxed, hearts_maxed, hitpoint_recover == 0, self._tmp['EffectTime'] > 0, monster_extract)
+        self._outcome = OUTCOME_TABLE[key]
+
+        possibilities = {}
+        for name, operations in self._outcome.possibilities.items():
+            values = [self._outcome_value(name, operation) for operation in operations]
+            # a single possibility is stored as a plain value
+            possibilities[name] = values if len(values) > 1 else values[0]
+        self._tmp[self._outcome.source] = possibilities
+
+    def _outcome_value(self, name, operation):
+
+        """Returns one possibility of a meal property (HitPointRecover, EffectLevel or EffectTime) for an outcome operation."""
+
+        value = self._tmp[name]
+        if operation == 'keep':
+            return value
+        if operation == 'add':
+            if name == 'HitPointRecover':
+                # SSAV of LifeRecover, e.g. 12 = 3 hearts
+                return value + self.effect['LifeRecover'].get('SuperSuccessAddVolume')
+            if name == 'EffectLevel':
+                return value + self.effect[self._tmp['Effect']].get('SuperSuccessAddVolume')
+            return value + self.system_data.get('SuperSuccessAddEffectiveTime')
+        if operation == 'min':
+            return 1 if name == 'HitPointRecover' else self.effect[self._tmp['Effect']].get('MinLv')
+        # fixed value
+        return operation
 
     def _super_success_rate(self):
 
@@ -450,68 +893,15 @@ class TotKCookSim():
 
         """Handles Critical meals shenanigans (mainly starts storing data for all possibilities)"""
 
-        effect = self._tmp['Effect']
-        effect_level = self._tmp['EffectLevel']
-        effect_time = self._tmp['EffectTime']
-        hitpoint_recover = self._tmp['HitPointRecover']
-
-        self._critical_flag = True
-        # initialize critical section
-        self._tmp['Critical'] = {}
-
-        # the following part is a simplified version of what the game does to know what to do with effect level, time and health recovery when
-        # a critical hit happens on a meal
-
         # if effect level <= 1.0, set the effect level to 1.0. That's the main difference between Monster Extract and Crit in regardes to
         # effect level. with crit, if level is chosen to be leveled up, it will always be >= 2.0 and will always be better than without crit,
         # while for monster extract, it has no guarantee to be >= 2.0 (e.g. can stay at level 1)
-        if effect_level <= 1.0:
-            effect_level, self._tmp['EffectLevel'] = 1.0, 1.0
+        if self._tmp['EffectLevel'] <= 1.0:
+            self._tmp['EffectLevel'] = 1.0
 
-        if effect == None:
-            # if the meal has no effect, since it has no effect level or time, it can only give a health crit. Health crit adds the SSAV of
-            # LifeRecover (as seen above, 12 = 3 hearts) to health recovery. All health criticals behave the same
-            self._critical_only_health_flag = True
-            self._tmp['Critical']['HitPointRecover'] = [hitpoint_recover, hitpoint_recover + self.effect['LifeRecover'].get('SuperSuccessAddVolume')]
-        elif effect == "LifeMaxUp":
-            # if the effect of the meal is Extra Hearts, its effect level gets the effect's SSAV added to it (in this case, 4 e.g. 1 yellow heart)
-            self._critical_only_level_flag = True
-            self._tmp['Critical']['EffectLevel'] = [effect_level, effect_level + self.effect[effect].get('SuperSuccessAddVolume')]
-        elif effect in ['StaminaRecover', 'ExStaminaMaxUp']:
-            # if the effect of the meal is stamina-related, the game checks whether or not the meal is already maxed out in terms of effect level
-            if effect_level >= self.effect[effect].get('MaxLv'):
-                # if it is, the meal gets a health crit
-                self._critical_only_health_flag = True
-                self._tmp['Critical']['HitPointRecover'] = [hitpoint_recover, hitpoint_recover + self.effect['LifeRecover'].get('SuperSuccessAddVolume')]
-            else:
-                # if it's not, the meal either gets a health crit, or a level crit (effect's SSAV added to it)
-                self._critical_health_level_flag = True
-                self._tmp['Critical']['HitPointRecover'] = [hitpoint_recover, hitpoint_recover + self.effect['LifeRecover'].get('SuperSuccessAddVolume')]
-                self._tmp['Critical']['EffectLevel'] = [effect_level, effect_level + self.effect[effect].get('SuperSuccessAddVolume')]
-        elif effect_level >= self.effect[effect].get('MaxLv'):
-            # if the meal is maxed out in terms of effect level, the game checks if it's maxed out in terms of health recovery (e.g. >= 40 hearts)
-            # honorable mention to LifeRepair (Gloom Recovery) that can get time crit despite being a non-timed effect because devs forgot to add
-            # a special case for it
-            if hitpoint_recover >= self.effect['LifeRecover'].get('MaxLv'):
-                # if it is, get a time critical, which adds 300 seconds to the meal effect duration (+5:00)
-                self._critical_only_time_flag = True
-                self._tmp['Critical']['EffectTime'] = [effect_time, effect_time + self.system_data.get('SuperSuccessAddEffectiveTime')]
-            else:
-                # if it's not, get either a time critical or a health critical
-                self._critical_health_time_flag = True
-                self._tmp['Critical']['HitPointRecover'] = [hitpoint_recover, hitpoint_recover + self.effect['LifeRecover'].get('SuperSuccessAddVolume')]
-                self._tmp['Critical']['EffectTime'] = [effect_time, effect_time + self.system_data.get('SuperSuccessAddEffectiveTime')]
-        elif hitpoint_recover >= self.effect['LifeRecover'].get('MaxLv'):
-            # if the meal is maxed out in terms of health, get either a time critical or an effect level critical
-            self._critical_level_time_flag = True
-            self._tmp['Critical']['EffectLevel'] = [effect_level, effect_level + self.effect[effect].get('SuperSuccessAddVolume')]
-            self._tmp['Critical']['EffectTime'] = [effect_time, effect_time + self.system_data.get('SuperSuccessAddEffectiveTime')]
-        else:
-            # if none of the cases above is met, roll between all three criticals
-            self._critical_health_level_time_flag = True
-            self._tmp['Critical']['HitPointRecover'] = [hitpoint_recover, hitpoint_recover + self.effect['LifeRecover'].get('SuperSuccessAddVolume')]
-            self._tmp['Critical']['EffectLevel'] = [effect_level, effect_level + self.effect[effect].get('SuperSuccessAddVolume')]
-            self._tmp['Critical']['EffectTime'] = [effect_time, effect_time + self.system_data.get('SuperSuccessAddEffectiveTime')]
+        # which of health, effect level and time a critical hit can raise depends on the effect and on whether level and health are
+        # already maxed out (see totk_cook_outcome.CRITICAL_RULES)
+        self._set_outcome(False)
 
     def _spice(self):
 
@@ -524,6 +914,9 @@ class TotKCookSim():
         effect_level = self._tmp['EffectLevel']
         effect_time = self._tmp['EffectTime']
         hitpoint_recover = self._tmp['HitPointRecover']
+        # Critical or Monster Extract possibilities that spices also apply to
+        adjusted = self._outcome.adjusted
+        possibilities = self._tmp.get(self._outcome.source)
 
         # cycle through materials, spice is applied only once per unique materila
         for material in materials_set:
@@ -531,22 +924,16 @@ class TotKCookSim():
             # materials would get overriden, should a Monster Extract change the time. The other CookTag materials can still add their time after
             if material.get('CookTag') != "CookEnemy":
                 # Health spice
-                if self._critical_health_level_flag or self._critical_health_level_time_flag or self._critical_health_time_flag or self._critical_only_health_flag:
-                    # Increase Critical possibilities
-                    self._tmp['Critical']['HitPointRecover'] = [self._tmp['Critical']['HitPointRecover'][0] + material.get('SpiceBoostHitPointRecover', 0), self._tmp['Critical']['HitPointRecover'][1] + material.get('SpiceBoostHitPointRecover', 0)]
-                elif self._monster_extract_health_level_random_flag or self._monster_extract_only_health_random_flag:
-                    # Increase monster extract possibilities
-                    self._tmp['Monster Extract']['HitPointRecover'] = [self._tmp['Monster Extract']['HitPointRecover'][0] + material.get('SpiceBoostHitPointRecover', 0), self._tmp['Monster Extract']['HitPointRecover'][1] + material.get('SpiceBoostHitPointRecover', 0), self._tmp['Monster Extract']['HitPointRecover'][2] + material.get('SpiceBoostHitPointRecover', 0)]
+                if 'HitPointRecover' in adjusted:
+                    # Increase Critical or Monster Extract possibilities
+                    possibilities['HitPointRecover'] = [value + material.get('SpiceBoostHitPointRecover', 0) for value in possibilities['HitPointRecover']]
                 # each ingerdient adds its SpiceBoostHitPointRecover to the health, if it exists, else it adds 0
                 hitpoint_recover += material.get('SpiceBoostHitPointRecover', 0)
 
                 # Time spice
-                if self._critical_only_time_flag or self._critical_health_time_flag or self._critical_health_level_time_flag or self._critical_level_time_flag:
-                    # Increase Critical possibilities
-                    self._tmp['Critical']['EffectTime'] = [self._tmp['Critical']['EffectTime'][0] + material.get('SpiceBoostEffectiveTime', 0), self._tmp['Critical']['EffectTime'][1] + material.get('SpiceBoostEffectiveTime', 0)]
-                elif self._monster_extract_time_flag:
-                    # Increase monster extract possibilities
-                    self._tmp['Monster Extract']['EffectTime'] = [self._tmp['Monster Extract']['EffectTime'][0] + material.get('SpiceBoostEffectiveTime', 0), self._tmp['Monster Extract']['EffectTime'][1] + material.get('SpiceBoostEffectiveTime', 0), self._tmp['Monster Extract']['EffectTime'][2] + material.get('SpiceBoostEffectiveTime', 0)]
+                if 'EffectTime' in adjusted:
+                    # Increase Critical or Monster Extract possibilities
+                    possibilities['EffectTime'] = [value + material.get('SpiceBoostEffectiveTime', 0) for value in possibilities['EffectTime']]
                 # each ingerdient adds its SpiceBoostEffectiveTime to the effect duration, if it exists, else it adds 0
                 effect_time += material.get('SpiceBoostEffectiveTime', 0)
             
@@ -556,23 +943,17 @@ class TotKCookSim():
             if material.get('CookTag') == "CookSpice":
                 # Extra Hearts spice
                 if effect == "LifeMaxUp":
-                    if self._critical_only_level_flag or self._critical_health_level_flag or self._critical_health_level_time_flag or self._critical_level_time_flag:
-                        # Increase Critical possibilities
-                        self._tmp['Critical']['EffectLevel'] = [self._tmp['Critical']['EffectLevel'][0] + material.get('SpiceBoostMaxHeartLevel', 0), self._tmp['Critical']['EffectLevel'][1] + material.get('SpiceBoostMaxHeartLevel', 0)]
-                    elif self._monster_extract_health_level_random_flag or self._monster_extract_only_level_flag:
-                        # Increase Monster extract possibilities
-                        self._tmp['Monster Extract']['EffectLevel'] = [self._tmp['Monster Extract']['EffectLevel'][0] + material.get('SpiceBoostMaxHeartLevel', 0), self._tmp['Monster Extract']['EffectLevel'][1] + material.get('SpiceBoostMaxHeartLevel', 0), self._tmp['Monster Extract']['EffectLevel'][2] + material.get('SpiceBoostMaxHeartLevel', 0)]
+                    if 'EffectLevel' in adjusted:
+                        # Increase Critical or Monster Extract possibilities
+                        possibilities['EffectLevel'] = [value + material.get('SpiceBoostMaxHeartLevel', 0) for value in possibilities['EffectLevel']]
                     # each CookSpice ingredient adds its SpiceBoostMaxHeartLevel to the effect level, if it exists, else it adds 0
                     effect_level += material.get('SpiceBoostMaxHeartLevel', 0)
 
                 # Stamina spice
                 elif effect in ['StaminaRecover', 'ExStaminaMaxUp']:
-                    if self._critical_only_level_flag or self._critical_health_level_flag or self._critical_health_level_time_flag or self._critical_level_time_flag:
-                        # Increase Critical possibilities
-                        self._tmp['Critical']['EffectLevel'] = [self._tmp['Critical']['EffectLevel'][0] + material.get('SpiceBoostStaminaLevel', 0), self._tmp['Critical']['EffectLevel'][1] + material.get('SpiceBoostStaminaLevel', 0)]
-                    elif self._monster_extract_health_level_random_flag or self._monster_extract_only_level_flag:
-                        # Increase Monster Extract possibilities
-                        self._tmp['Monster Extract']['EffectLevel'] = [self._tmp['Monster Extract']['EffectLevel'][0] + material.get('SpiceBoostStaminaLevel', 0), self._tmp['Monster Extract']['EffectLevel'][1] + material.get('SpiceBoostStaminaLevel', 0), self._tmp['Monster Extract']['EffectLevel'][2] + material.get('SpiceBoostStaminaLevel', 0)]
+                    if 'EffectLevel' in adjusted:
+                        # Increase Critical or Monster Extract possibilities
+                        possibilities['EffectLevel'] = [value + material.get('SpiceBoostStaminaLevel', 0) for value in possibilities['EffectLevel']]
                     # each CookSpice ingredient adds its SpiceBoostStaminaLevel to the effect level, if it exists, else it adds 0
                     effect_level += material.get('SpiceBoostStaminaLevel', 0)
 
@@ -586,66 +967,58 @@ class TotKCookSim():
 
         recipe = self._tmp['Recipe']
         effect = self._tmp.get('Effect')
+        # Critical or Monster Extract possibilities that get the same bonuses and adjustments as the meal
+        adjusted = self._outcome.adjusted
+        possibilities = self._tmp.get(self._outcome.source)
 
         # Bonus meal time
-        if self._monster_extract_time_flag:
-            self._tmp['Monster Extract']['EffectTime'] = [min(self._tmp['Monster Extract']['EffectTime'][0] + recipe.get('BonusTime', 0), 1800), min(self._tmp['Monster Extract']['EffectTime'][1] + recipe.get('BonusTime', 0), 1800), min(self._tmp['Monster Extract']['EffectTime'][2] + recipe.get('BonusTime', 0), 1800)]
-        elif self._critical_only_time_flag or self._critical_health_time_flag or self._critical_health_level_time_flag:
-            self._tmp['Critical']['EffectTime'] = [min(self._tmp['Critical']['EffectTime'][0] + recipe.get('BonusTime', 0), 1800), min(self._tmp['Critical']['EffectTime'][1] + recipe.get('BonusTime', 0), 1800)]
+        if self._outcome.bonus_time:
+            possibilities['EffectTime'] = [min(value + recipe.get('BonusTime', 0), 1800) for value in possibilities['EffectTime']]
         # adds the meal's BonusTime if it exists, and sets EffectTime to 1800 if it's >= 1800
         self._tmp['EffectTime'] = min(self._tmp['EffectTime'] + recipe.get('BonusTime', 0), 1800)
 
         # Bonus meal health
-        if self._critical_health_level_flag or self._critical_health_level_time_flag or self._critical_health_time_flag or self._critical_only_health_flag:
-            self._tmp['Critical']['HitPointRecover'] = [min(120, self._tmp['Critical']['HitPointRecover'][0] + recipe.get('BonusHeart', 0)), min(120, self._tmp['Critical']['HitPointRecover'][1] + recipe.get('BonusHeart', 0))]
-            self._tmp['Critical']['HitPointRecover'] = [self.effect['LifeRecover'].get('MaxLv') if self._tmp['Critical']['HitPointRecover'][0] == 120 else self._tmp['Critical']['HitPointRecover'][0], self.effect['LifeRecover'].get('MaxLv') if self._tmp['Critical']['HitPointRecover'][1] == 120 else self._tmp['Critical']['HitPointRecover'][1]]
-            if effect == 'LifeMaxUp':
-                self._tmp['Critical']['HitPointRecover'] = [self.effect['LifeRecover'].get('MaxLv'), self.effect['LifeRecover'].get('MaxLv')]
-            if effect == None:
-                self._tmp['Critical']['HitPointRecover'] = [1 if self._tmp['Critical']['HitPointRecover'][0] == 0 else self._tmp['Critical']['HitPointRecover'][0], 1 if self._tmp['Critical']['HitPointRecover'][1] == 0 else self._tmp['Critical']['HitPointRecover'][1]]
-        elif self._monster_extract_health_level_random_flag or self._monster_extract_only_health_random_flag:
-            self._tmp['Monster Extract']['HitPointRecover'] = [min(120, self._tmp['Monster Extract']['HitPointRecover'][0] + recipe.get('BonusHeart', 0)), min(120, self._tmp['Monster Extract']['HitPointRecover'][1] + recipe.get('BonusHeart', 0)), min(120, self._tmp['Monster Extract']['HitPointRecover'][2] + recipe.get('BonusHeart', 0))]
-            self._tmp['Monster Extract']['HitPointRecover'] = [self.effect['LifeRecover'].get('MaxLv') if self._tmp['Monster Extract']['HitPointRecover'][0] == 120 else self._tmp['Monster Extract']['HitPointRecover'][0], self.effect['LifeRecover'].get('MaxLv') if self._tmp['Monster Extract']['HitPointRecover'][1] == 120 else self._tmp['Monster Extract']['HitPointRecover'][1], self.effect['LifeRecover'].get('MaxLv') if self._tmp['Monster Extract']['HitPointRecover'][2] == 120 else self._tmp['Monster Extract']['HitPointRecover'][2]]
+        if 'HitPointRecover' in adjusted:
             if effect == 'LifeMaxUp':
-                self._tmp['Monster Extract']['HitPointRecover'] = [self.effect['LifeRecover'].get('MaxLv'), self.effect['LifeRecover'].get('MaxLv'), self.effect['LifeRecover'].get('MaxLv')]
-            if effect == None:
-                self._tmp['Monster Extract']['HitPointRecover'] = [1 if self._tmp['Monster Extract']['HitPointRecover'][0] == 0 else self._tmp['Monster Extract']['HitPointRecover'][0], 1 if self._tmp['Monster Extract']['HitPointRecover'][1] == 0 else self._tmp['Monster Extract']['HitPointRecover'][1], 1 if self._tmp['Monster Extract']['HitPointRecover'][2] == 0 else self._tmp['Monster Extract']['HitPointRecover'][2]]
-        
+                # Extra Hearts meals always fully recover
+                possibilities['HitPointRecover'] = [self.effect['LifeRecover'].get('MaxLv')] * len(possibilities['HitPointRecover'])
+            else:
+                possibilities['HitPointRecover'] = [self._adjust_hitpoint_recover(value, effect) for value in possibilities['HitPointRecover']]
+        self._tmp['HitPointRecover'] = self._adjust_hitpoint_recover(self._tmp['HitPointRecover'], effect)
+
+        # Clamping Effect
+        if effect:
+            if 'EffectLevel' in adjusted:
+                possibilities['EffectLevel'] = [self._adjust_effect_level(value, effect) for value in possibilities['EffectLevel']]
+            self._tmp['EffectLevel'] = self._adjust_effect_level(self._tmp['EffectLevel'], effect)
+
+    def _adjust_hitpoint_recover(self, hitpoint_recover, effect):
+
+        """Adds the recipe BonusHeart to a health recovery, and clamps it."""
+
         # adds the meal's BonusHeart if it exists, and sets HitPointRecover to 120 if it's >= 120
-        self._tmp['HitPointRecover'] = min(120, self._tmp['HitPointRecover'] + recipe.get('BonusHeart', 0))
+        hitpoint_recover = min(120, hitpoint_recover + self._tmp['Recipe'].get('BonusHeart', 0))
         # if HitPointRecover is 120, set it to LifeRecover's MaxLv e.g. 160
-        self._tmp['HitPointRecover'] = self.effect['LifeRecover'].get('MaxLv') if self._tmp['HitPointRecover'] == 120 else self._tmp['HitPointRecover']
+        hitpoint_recover = self.effect['LifeRecover'].get('MaxLv') if hitpoint_recover == 120 else hitpoint_recover
         # if no effect and no health recovery, sets health recovery to 1 (there is no meal with no effect and no health recovery)
         if effect == None:
-            self._tmp['HitPointRecover'] = 1 if self._tmp['HitPointRecover'] == 0 else self._tmp['HitPointRecover']
+            hitpoint_recover = 1 if hitpoint_recover == 0 else hitpoint_recover
+        return hitpoint_recover
 
-        # Clamping Effect
-        if effect:
-            if self._monster_extract_only_level_flag or self._monster_extract_health_level_random_flag:
-                self._tmp['Monster Extract']['EffectLevel'] = [min(self.effect[effect].get('MaxLv'), self._tmp['Monster Extract']['EffectLevel'][0]), min(self.effect[effect].get('MaxLv'), self._tmp['Monster Extract']['EffectLevel'][1]), min(self.effect[effect].get('MaxLv'), self._tmp['Monster Extract']['EffectLevel'][2])]
-                self._tmp['Monster Extract']['EffectLevel'] = [1.0 if self._tmp['Monster Extract']['EffectLevel'][0] <= 1.0 and self._tmp['Monster Extract']['EffectLevel'][0] > 0 else self._tmp['Monster Extract']['EffectLevel'][0], 1.0 if self._tmp['Monster Extract']['EffectLevel'][1] <= 1.0 and self._tmp['Monster Extract']['EffectLevel'][1] > 0 else self._tmp['Monster Extract']['EffectLevel'][1], 1.0 if self._tmp['Monster Extract']['EffectLevel'][2] <= 1.0 and self._tmp['Monster Extract']['EffectLevel'][2] > 0 else self._tmp['Monster Extract']['EffectLevel'][2]]
-                if effect in ['LifeMaxUp', 'LifeRepair']:
-                    self._tmp['Monster Extract']['EffectLevel'] = [4 * round(self._tmp['Monster Extract']['EffectLevel'][0] / 4), 4 * round(self._tmp['Monster Extract']['EffectLevel'][1] / 4), 4 * round(self._tmp['Monster Extract']['EffectLevel'][2] / 4)]
-                    self._tmp['Monster Extract']['EffectLevel'] = [4 if self._tmp['Monster Extract']['EffectLevel'][0] <= 4.0 and self._tmp['Monster Extract']['EffectLevel'][0] > 0 else self._tmp['Monster Extract']['EffectLevel'][0], 4 if self._tmp['Monster Extract']['EffectLevel'][1] <= 4.0 and self._tmp['Monster Extract']['EffectLevel'][1] > 0 else self._tmp['Monster Extract']['EffectLevel'][1], 4 if self._tmp['Monster Extract']['EffectLevel'][2] <= 4.0 and self._tmp['Monster Extract']['EffectLevel'][2] > 0 else self._tmp['Monster Extract']['EffectLevel'][2]]
-                self._tmp['Monster Extract']['EffectLevel'] = [math.floor(self._tmp['Monster Extract']['EffectLevel'][0]), math.floor(self._tmp['Monster Extract']['EffectLevel'][1]), math.floor(self._tmp['Monster Extract']['EffectLevel'][2])]
-            elif self._critical_health_level_flag or self._critical_health_level_time_flag or self._critical_only_level_flag or self._critical_level_time_flag:
-                self._tmp['Critical']['EffectLevel'] = [min(self.effect[effect].get('MaxLv'), self._tmp['Critical']['EffectLevel'][0]), min(self.effect[effect].get('MaxLv'), self._tmp['Critical']['EffectLevel'][1])]
-                self._tmp['Critical']['EffectLevel'] = [1.0 if self._tmp['Critical']['EffectLevel'][0] <= 1.0 and self._tmp['Critical']['EffectLevel'][0] > 0 else self._tmp['Critical']['EffectLevel'][0], 1.0 if self._tmp['Critical']['EffectLevel'][1] <= 1.0 and self._tmp['Critical']['EffectLevel'][1] > 0 else self._tmp['Critical']['EffectLevel'][1]]
-                if effect in ['LifeMaxUp', 'LifeRepair']:
-                    self._tmp['Critical']['EffectLevel'] = [4 * round(self._tmp['Critical']['EffectLevel'][0] / 4), 4 * round(self._tmp['Critical']['EffectLevel'][1] / 4)]
-                    self._tmp['Critical']['EffectLevel'] = [4 if self._tmp['Critical']['EffectLevel'][0] <= 4.0 and self._tmp['Critical']['EffectLevel'][0] > 0 else self._tmp['Critical']['EffectLevel'][0], 4 if self._tmp['Critical']['EffectLevel'][1] <= 4.0 and self._tmp['Critical']['EffectLevel'][1] > 0 else self._tmp['Critical']['EffectLevel'][1]]
-                self._tmp['Critical']['EffectLevel'] = [math.floor(self._tmp['Critical']['EffectLevel'][0]), math.floor(self._tmp['Critical']['EffectLevel'][1])]
-            
-            # Sets EffectLevel to its MaxLv if EffectLevel >= MaxLv
-            self._tmp['EffectLevel'] = min(self.effect[effect].get('MaxLv'), self._tmp['EffectLevel'])
-            # Sets EffectLevel to 1.0 if EffectLevel between 0 (not included) and 1
-            self._tmp['EffectLevel'] = 1.0 if self._tmp['EffectLevel'] <= 1.0 and self._tmp['EffectLevel'] > 0 else self._tmp['EffectLevel']
-            # Rounds to the nearest 4 so that only whole hearts are allowed for Extra Hearts and Gloom Recovery
-            if effect in ['LifeMaxUp', 'LifeRepair']:
-                self._tmp['EffectLevel'] = 4 * round(self._tmp['EffectLevel'] / 4)
-                self._tmp['EffectLevel'] = 4 if self._tmp['EffectLevel'] <= 4.0 and self._tmp['EffectLevel'] > 0 else self._tmp['EffectLevel']
-            # Final effect level is floored
-            self._tmp['EffectLevel'] = math.floor(self._tmp['EffectLevel'])
+    def _adjust_effect_level(self, effect_level, effect):
+
+        """Clamps and rounds an effect level."""
+
+        # Sets EffectLevel to its MaxLv if EffectLevel >= MaxLv
+        effect_level = min(self.effect[effect].get('MaxLv'), effect_level)
+        # Sets EffectLevel to 1.0 if EffectLevel between 0 (not included) and 1
+        effect_level = 1.0 if effect_level <= 1.0 and effect_level > 0 else effect_level
+        # Rounds to the nearest 4 so that only whole hearts are allowed for Extra Hearts and Gloom Recovery
+        if effect in ['LifeMaxUp', 'LifeRepair']:
+            effect_level = 4 * round(effect_level / 4)
+            effect_level = 4 if effect_level <= 4.0 and effect_level > 0 else effect_level
+        # Final effect level is floored
+        return math.floor(effect_level)
 
     def _sell_price(self):
 
@@ -681,18 +1054,21 @@ class TotKCookSim():
         self._tmp['RNG'] = ''
         result_actor_name = self._tmp['Recipe']['ResultActorName']
         effect = self._tmp.get('Effect')
+        # properties that have Monster Extract or Critical possibilities to describe
+        monster_extract_adjusted = self._outcome.adjusted if self._outcome.source == MONSTER_EXTRACT else frozenset()
+        critical_adjusted = self._outcome.adjusted if self._outcome.source == CRITICAL else frozenset()
         
         # gets base meal name
-        locale_actor_name = self._locale_dict['Meal'][f'{result_actor_name}_Name'][self.area_lang]
+        locale_actor_name = self._strings['Meal'][f'{result_actor_name}_Name']
         
         locale_effect_name = ''
         locale_buff_name = ''
 
         if effect:
             # gets effect prefix
-            locale_effect_name = self._locale_dict['Effect'][effect+'_Name'][self.area_lang]
+            locale_effect_name = self._strings['Effect'][effect+'_Name']
             # gets effect name
-            locale_buff_name = self._locale_dict['Buff'][effect][self.area_lang]
+            locale_buff_name = self._strings['Buff'][effect]
             # full meal name
             locale_meal_name = locale_effect_name + ' ' + locale_actor_name
         else:
@@ -706,7 +1082,7 @@ class TotKCookSim():
         crit_time_min, crit_time_sec = divmod(self.system_data['SuperSuccessAddEffectiveTime'], 60)
         crit_time_string = "{:02d}:{:02d}".format(int(crit_time_min), int(crit_time_sec))
 
-        if self._monster_extract_time_flag:
+        if 'EffectTime' in monster_extract_adjusted:
             # if monster extract affects time, generate string for all three times
             minutes0, seconds0 = divmod(self._tmp['Monster Extract']['EffectTime'][0], 60)
             minutes1, seconds1 = divmod(self._tmp['Monster Extract']['EffectTime'][1], 60)
@@ -716,7 +1092,7 @@ class TotKCookSim():
             effect_time_str2 = "{:02d}:{:02d}".format(int(minutes2), int(seconds2))
             self._tmp['RNG'] += f"Monster Extract sets time to {effect_time_str0}, {effect_time_str1} or {effect_time_str2} (each 33.3%)"
 
-        elif self._critical_only_time_flag or self._critical_health_time_flag or self._critical_health_level_time_flag or self._critical_level_time_flag:
+        elif 'EffectTime' in critical_adjusted:
             # if time critical, generate string for the time addition
             self._tmp['RNG'] += f"If there's a critical hit, duration gets a {crit_time_string} increase"
 
@@ -734,7 +1110,7 @@ class TotKCookSim():
             3: '¾'
         }
 
-        if self._monster_extract_only_health_random_flag or self._monster_extract_health_level_random_flag:
+        if 'HitPointRecover' in monster_extract_adjusted:
             # if monster extract affects health, generate string for both bad and good case
             whole_heart0, quarter_heart0 = divmod(self._tmp['Monster Extract']['HitPointRecover'][0], 4)
             whole_heart0, quarter_heart0 = int(whole_heart0), int(quarter_heart0)
@@ -745,14 +1121,13 @@ class TotKCookSim():
                 if quarter_heart0:
                     heart_str0 += quarter_heart_map[quarter_heart0]+'♥'
             heart_str0 = "None" if heart_str0 == "" else heart_str0
-            if self._monster_extract_only_health_random_flag or self._monster_extract_health_level_random_flag:
-                # covers both cases of getting or not full health 
-                if self._tmp['HitPointRecover'] + int(self.effect['LifeRecover'].get('SuperSuccessAddVolume') / 4) >= 120:
-                    self._tmp['RNG'] += f"Monster Extract sets health recovery to {heart_str0}, either adds Full Recovery"
-                else:
-                    self._tmp['RNG'] += f"Monster Extract sets health recovery to {heart_str0}, either adds {int(self.effect['LifeRecover'].get('SuperSuccessAddVolume') / 4)} Hearts"
+            # covers both cases of getting or not full health 
+            if self._tmp['HitPointRecover'] + int(self.effect['LifeRecover'].get('SuperSuccessAddVolume') / 4) >= 120:
+                self._tmp['RNG'] += f"Monster Extract sets health recovery to {heart_str0}, either adds Full Recovery"
+            else:
+                self._tmp['RNG'] += f"Monster Extract sets health recovery to {heart_str0}, either adds {int(self.effect['LifeRecover'].get('SuperSuccessAddVolume') / 4)} Hearts"
 
-        elif self._critical_only_health_flag or self._critical_health_level_flag or self._critical_health_level_time_flag or self._critical_health_time_flag:
+        elif 'HitPointRecover' in critical_adjusted:
             # if critical effects health, generate string for health addition
             # covers both cases of getting or not full health
             if self._tmp['HitPointRecover'] + self.effect['LifeRecover'].get('SuperSuccessAddVolume') >= 120:
@@ -783,47 +1158,47 @@ class TotKCookSim():
 
         if effect == "LifeMaxUp":
             # needs specific string format for "Extra Heart(s)"
-            if self._monster_extract_only_level_flag or self._monster_extract_health_level_random_flag:
+            if 'EffectLevel' in monster_extract_adjusted:
                 self._tmp['RNG'] += f"Monster Extract sets meal effect to {int(self._tmp['Monster Extract']['EffectLevel'][0] / 4)} Extra Heart, either adds {int((self._tmp['Monster Extract']['EffectLevel'][2] - self._tmp['Monster Extract']['EffectLevel'][1]) / 4)} Extra Heart to the meal effect'"
-            elif self._critical_only_level_flag or self._critical_health_level_flag or self._critical_health_level_time_flag or self._critical_level_time_flag:
+            elif 'EffectLevel' in critical_adjusted:
                 self._tmp['RNG'] += f"If there's a critical hit, adds {int((self._tmp['Critical']['EffectLevel'][1] - self._tmp['Critical']['EffectLevel'][0]) / 4)} Extra Heart to the meal effect"
             level_str = str(int(self._tmp['EffectLevel'] / 4)) + " Extra Heart(s)"
             effect_time_str = "None"
         elif effect == "StaminaRecover":
             # needs specific string format for "Stamina Segment(s)"
-            if self._monster_extract_only_level_flag or self._monster_extract_health_level_random_flag:
+            if 'EffectLevel' in monster_extract_adjusted:
                 self._tmp['RNG'] += f"Monster Extract sets meal effect to {self._tmp['Monster Extract']['EffectLevel'][0]} Stamina Segment, either adds {self._tmp['Monster Extract']['EffectLevel'][2] - self._tmp['Monster Extract']['EffectLevel'][1]} Stamina Segments to the meal effect"
-            elif self._critical_only_level_flag or self._critical_health_level_flag or self._critical_health_level_time_flag or self._critical_level_time_flag:
+            elif 'EffectLevel' in critical_adjusted:
                 self._tmp['RNG'] += f"If there's a critical hit, adds {self._tmp['Critical']['EffectLevel'][1] - self._tmp['Critical']['EffectLevel'][0]} Stamina Segments to the meal effect"
             level_str = str(int(self._tmp['EffectLevel'])) + " Stamina Segment(s)"
             effect_time_str = "None"
         elif effect == "ExStaminaMaxUp":
             # needs specific string format for "Extra Stamina Segment(s)"
-            if self._monster_extract_only_level_flag or self._monster_extract_health_level_random_flag:
+            if 'EffectLevel' in monster_extract_adjusted:
                 self._tmp['RNG'] += f"Monster Extract sets meal effect to {self._tmp['Monster Extract']['EffectLevel'][0]} Extra Stamina Segment, either adds {self._tmp['Monster Extract']['EffectLevel'][2] - self._tmp['Monster Extract']['EffectLevel'][1]} Extra Stamina Segments to the meal effect"
-            elif self._critical_only_level_flag or self._critical_health_level_flag or self._critical_health_level_time_flag or self._critical_level_time_flag:
+            elif 'EffectLevel' in critical_adjusted:
                 self._tmp['RNG'] += f"If there's a critical hit, adds {self._tmp['Critical']['EffectLevel'][1] - self._tmp['Critical']['EffectLevel'][0]} Extra Stamina Segments to the meal effect"
             level_str = str(int(self._tmp['EffectLevel'])) + " Extra Stamina Segment(s)"
             effect_time_str = "None"
         elif effect == "LifeRepair":
             # needs specific string format for "Ungloomed Heart(s)"
-            if self._monster_extract_only_level_flag or self._monster_extract_health_level_random_flag:
+            if 'EffectLevel' in monster_extract_adjusted:
                 self._tmp['RNG'] += f"Monster Extract sets meal effect to {int(self._tmp['Monster Extract']['EffectLevel'][0] / 4)} Ungloomed Heart, either adds {int((self._tmp['Monster Extract']['EffectLevel'][2] - self._tmp['Monster Extract']['EffectLevel'][1]) / 4)} Ungloomed Heart to the meal effect"
-            elif self._critical_only_level_flag or self._critical_health_level_flag or self._critical_health_level_time_flag or self._critical_level_time_flag:
+            elif 'EffectLevel' in critical_adjusted:
                 self._tmp['RNG'] += f"If there's a critical hit, adds {int((self._tmp['Critical']['EffectLevel'][1] - self._tmp['Critical']['EffectLevel'][0]) / 4)} Ungloomed Heart to the meal effect"
             level_str = str(int(self._tmp['EffectLevel'] / 4)) + " Ungloomed Hearts"
             effect_time_str = "None"
         else:
             # regular level string format
-            if self._monster_extract_only_level_flag or self._monster_extract_health_level_random_flag:
+            if 'EffectLevel' in monster_extract_adjusted:
                 self._tmp['RNG'] += f"Monster Extract sets effect level to {self._tmp['Monster Extract']['EffectLevel'][0]}, either adds {self._tmp['Monster Extract']['EffectLevel'][2] - self._tmp['Monster Extract']['EffectLevel'][1]} level(s) to the effect"
-            elif self._critical_only_level_flag or self._critical_health_level_flag or self._critical_health_level_time_flag or self._critical_level_time_flag:
+            elif 'EffectLevel' in critical_adjusted:
                 self._tmp['RNG'] += f"If there's a critical hit, adds {self._tmp['Critical']['EffectLevel'][1] - self._tmp['Critical']['EffectLevel'][0]} level(s) to the effect"
             level_str = str(self._tmp['EffectLevel'])
 
         # description
 
-        locale_actor_caption = self._locale_dict['Meal'][f'{result_actor_name}_Caption'][self.area_lang]
+        locale_actor_caption = self._strings['Meal'][f'{result_actor_name}_Caption']
         locale_effect_desc = ''
 
         if effect:
@@ -836,7 +1211,7 @@ class TotKCookSim():
             
             if self.effect[effect].get('MaxLv') <= 3 and self._tmp['EffectLevel'] > 1:
                 effect_desc_key += '_{:02d}'.format(self._tmp['EffectLevel'])
-            locale_effect_desc = self._locale_dict['Effect'][effect_desc_key][self.area_lang]
+            locale_effect_desc = self._strings['Effect'][effect_desc_key]
 
         local_meal_desc = (locale_effect_desc +'\n' + locale_actor_caption).strip()
         
@@ -881,7 +1256,7 @@ class TotKCookSim():
             else:
                 me_text = "Monster Extract "
                 # need to separate cases for monster extract time or not because of the "and" it implies
-                if self._monster_extract_time_flag:
+                if 'EffectTime' in monster_extract_adjusted:
                     part_amount = self._tmp['RNG'].count("Monster Extract ")
                     # if only one monster extract non-time change
                     if part_amount == 1:
@@ -911,6 +1286,77 @@ class TotKCookSim():
         self.output = {}
         for k, v in self._result.items():
             self.output[k] = v
+
+    def _trace(self):
+
+        """Explains the last cook: which recipe matched and from where, which materials gave the effect, which Critical and Monster
+        Extract branches were taken and which price rate was applied."""
+
+        materials_list = self._tmp['Materials']
+        final_recipe = self._tmp['Recipe']
+        trace = {}
+
+        # recipe matching is run again on the side (bypassing the memo, so that traces don't count in its statistics), to know what
+        # matched before the later steps possibly turned the meal into a failure
+        unique_pairs = self._name_tag_pairs(materials_list)
+        matched_recipe = self._match_recipe(unique_pairs)
+
+        if matched_recipe is None:
+            source = 'None'
+        elif matched_recipe in self.recipes_single:
+            # single recipes are only searched for multiple materials when the CookSpice fallback kicks in
+            source = 'SingleRecipeData' if len(unique_pairs) == 1 else 'SingleRecipeData (CookSpice fallback)'
+        else:
+            source = 'RecipeData'
+        trace['Recipe'] = {
+            'Source': source,
+            'Index': None if matched_recipe is None else (self.recipes_single if source.startswith('Single') else self.recipes).index(matched_recipe),
+            'Recipe': None if matched_recipe is None else matched_recipe['Recipe'],
+            'ResultActorName': final_recipe['ResultActorName'],
+            'CookSpice fallback': source == 'SingleRecipeData (CookSpice fallback)',
+            # Elixirs without a single effect turn into a failure after matching
+            'Turned into failure': matched_recipe is not None and final_recipe is FAILURE_RECIPE
+        }
+
+        # effect: every material with an effect and the potency it brings
+        contributions = []
+        for material in materials_list:
+            if 'CureEffectType' in material:
+                effect = material['CureEffectType']
+                contributions.append({
+                    'Material': material['ActorName'],
+                    'CureEffectType': effect,
+                    'CureEffectLevel': material.get('CureEffectLevel', 0),
+                    'Rate': self.effect[effect].get('Rate', 0) if effect in self.effect else 0
+                })
+        trace['Effect'] = {
+            'Effect': self._tmp.get('Effect'),
+            'Contributions': contributions,
+            'Clashing effects': len(set(item['CureEffectType'] for item in contributions)) > 1,
+            'CookEnemy bonus time': sum(material.get('SpiceBoostEffectiveTime', 0) for material in materials_list if material.get('CookTag') == 'CookEnemy')
+        }
+
+        # every Critical and Monster Extract flag that was set, and the possibilities they generated
+        trace['Branches'] = {
+            'Flags': list(self._outcome.flags),
+            'Critical': self._tmp.get('Critical'),
+            'Monster Extract': self._tmp.get('Monster Extract'),
+            'SuperSuccessRate': self._tmp.get('SuperSuccessRate', 0)
+        }
+
+        # price: failures get a fixed price, other meals get the rate of their amount of materials
+        price_rate = None
+        for item in self.system_data['PriceRateList']:
+            if item['MaterialNum'] == len(materials_list):
+                price_rate = item
+        trace['Price'] = {
+            'PriceRateList entry': None if final_recipe.get('CookFailure', False) else price_rate,
+            'Material price sum': sum(1 if material.get('CookLowPrice', False) else material.get('SellingPrice', 0) for material in materials_list),
+            'CookLowPrice materials': [material['ActorName'] for material in materials_list if material.get('CookLowPrice', False)],
+            'SellingPrice': self._tmp['SellingPrice']
+        }
+
+        return trace
         
 if __name__ == "__main__":
     meal = TotKCookSim()
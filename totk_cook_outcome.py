@@ -0,0 +1,128 @@
+# Critical and Monster Extract outcomes as a table, instead of if/elif chains and flags re-tested by every cooking step
+# a meal falls in one row of the table according to a few properties (kind of effect, effect level maxed, health maxed, no health,
+# timed effect, Monster Extract present), and the row tells which RNG variants apply, what possibilities each of them generates for
+# health, effect level and duration, and which of those possibilities the later steps (spices, bonuses, clamping, RNG text) adjust
+
+import itertools
+from collections import namedtuple
+
+CRITICAL = 'Critical'
+MONSTER_EXTRACT = 'Monster Extract'
+
+# effects Critical and Monster Extract handle differently from the others
+STAMINA_EFFECTS = ['StaminaRecover', 'ExStaminaMaxUp']
+EFFECT_KINDS = [None, 'LifeMaxUp', 'Stamina', 'Other']
+
+# possibilities of each variant, for each property they touch, as operations on the value of the meal:
+# 'keep' the value, 'add' the SuperSuccessAddVolume of the effect (of LifeRecover for health, SuperSuccessAddEffectiveTime for
+# duration), set it to the 'min' (1 for health, MinLv of the effect for level), or set it to a fixed value
+VARIANTS = {
+    'critical_only_health': {'HitPointRecover': ('keep', 'add')},
+    'critical_only_level': {'EffectLevel': ('keep', 'add')},
+    'critical_only_time': {'EffectTime': ('keep', 'add')},
+    'critical_health_level': {'HitPointRecover': ('keep', 'add'), 'EffectLevel': ('keep', 'add')},
+    'critical_health_time': {'HitPointRecover': ('keep', 'add'), 'EffectTime': ('keep', 'add')},
+    'critical_level_time': {'EffectLevel': ('keep', 'add'), 'EffectTime': ('keep', 'add')},
+    'critical_health_level_time': {'HitPointRecover': ('keep', 'add'), 'EffectLevel': ('keep', 'add'), 'EffectTime': ('keep', 'add')},
+    'monster_extract_time': {'EffectTime': (60, 600, 1800)},
+    'monster_extract_only_health_up': {'HitPointRecover': ('add',)},
+    'monster_extract_only_health_random': {'HitPointRecover': ('min', 'keep', 'add')},
+    'monster_extract_health_level_random': {'HitPointRecover': ('min', 'keep', 'add'), 'EffectLevel': ('min', 'keep', 'add')},
+    'monster_extract_only_level': {'EffectLevel': ('min', 'keep', 'add')}
+}
+# variants whose possibilities are left as they are by spices, bonuses and clamping, and don't appear in the RNG text
+UNADJUSTED_VARIANTS = ['monster_extract_only_health_up']
+# variants whose duration possibilities don't get the recipe BonusTime
+NO_BONUS_TIME_VARIANTS = ['critical_level_time']
+
+# '*' matches anything, first matching rule wins
+# (effect kind, level maxed, health maxed) -> Critical variant
+CRITICAL_RULES = [
+    ((None, '*', '*'), 'critical_only_health'),
+    (('LifeMaxUp', '*', '*'), 'critical_only_level'),
+    (('Stamina', True, '*'), 'critical_only_health'),
+    (('Stamina', False, '*'), 'critical_health_level'),
+    (('Other', True, True), 'critical_only_time'),
+    (('Other', True, False), 'critical_health_time'),
+    (('Other', False, True), 'critical_level_time'),
+    (('Other', False, False), 'critical_health_level_time')
+]
+# (effect kind, no health) -> Monster Extract variant, on top of monster_extract_time for timed effects
+MONSTER_EXTRACT_RULES = [
+    (('LifeMaxUp', '*'), 'monster_extract_only_level'),
+    ((None, True), 'monster_extract_only_health_up'),
+    ((None, False), 'monster_extract_only_health_random'),
+    (('*', True), 'monster_extract_only_level'),
+    (('*', False), 'monster_extract_health_level_random')
+]
+
+# order in which variants are listed (the order the flags used to be declared in)
+FLAG_ORDER = [
+    'monster_extract_time',
+    'monster_extract_only_health_up',
+    'monster_extract_only_health_random',
+    'monster_extract_health_level_random',
+    'monster_extract_only_level',
+    'monster_extract',
+    'critical_only_time',
+    'critical_only_health',
+    'critical_health_level',
+    'critical_health_time',
+    'critical_health_level_time',
+    'critical_level_time',
+    'critical_only_level',
+    'critical'
+]
+
+# source: CRITICAL, MONSTER_EXTRACT or None; flags: names of the variants that apply; possibilities: property -> operations;
+# adjusted: properties whose possibilities the later steps adjust; bonus_time: whether duration possibilities get the recipe BonusTime
+Outcome = namedtuple('Outcome', ['source', 'flags', 'possibilities', 'adjusted', 'bonus_time'])
+
+NO_OUTCOME = Outcome(None, (), {}, frozenset(), False)
+
+def effect_kind(effect):
+
+    """Returns the kind of an effect, as used in the outcome table keys."""
+
+    if effect is None or effect == 'LifeMaxUp':
+        return effect
+    return 'Stamina' if effect in STAMINA_EFFECTS else 'Other'
+
+def outcome_key(effect, level_maxed, hearts_maxed, hearts_zero, timed, monster_extract):
+
+    return (effect_kind(effect), level_maxed, hearts_maxed, hearts_zero, timed, monster_extract)
+
+def _first_match(rules, values):
+
+    for pattern, variant in rules:
+        if all(expected == '*' or expected == value for expected, value in zip(pattern, values)):
+            return variant
+
+def _build_outcome(kind, level_maxed, hearts_maxed, hearts_zero, timed, monster_extract):
+
+    if monster_extract:
+        variants = [_first_match(MONSTER_EXTRACT_RULES, (kind, hearts_zero))]
+        # Monster Extract always sets the duration of a timed effect
+        if kind is not None and timed:
+            variants.insert(0, 'monster_extract_time')
+        source = MONSTER_EXTRACT
+    else:
+        variants = [_first_match(CRITICAL_RULES, (kind, level_maxed, hearts_maxed))]
+        source = CRITICAL
+
+    possibilities = {}
+    adjusted = set()
+    for variant in variants:
+        possibilities.update(VARIANTS[variant])
+        if variant not in UNADJUSTED_VARIANTS:
+            adjusted.update(VARIANTS[variant])
+    flags = sorted(variants + ['monster_extract' if monster_extract else 'critical'], key = FLAG_ORDER.index)
+    bonus_time = 'EffectTime' in adjusted and not any(variant in NO_BONUS_TIME_VARIANTS for variant in variants)
+    return Outcome(source, tuple(flags), possibilities, frozenset(adjusted), bonus_time)
+
+# every key -> outcome
+OUTCOME_TABLE = {key: _build_outcome(*key) for key in itertools.product(EFFECT_KINDS, *[[False, True]] * 5)}
+
+if __name__ == "__main__":
+    for key, outcome in OUTCOME_TABLE.items():
+        print(key, outcome.flags)
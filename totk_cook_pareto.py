@@ -0,0 +1,93 @@
+# Pareto-optimal pots across several objectives (e.g. hearts, effect duration and sell price for one effect): pots that no other pot
+# beats or equals on every objective at once
+# pots are built one material at a time like in totk_cook_complete.py, the per-material contributions of totk_cook_space.ObjectiveBound
+# give, for every partial pot, the best values any of its extensions could reach; when a pot already on the frontier is at least as
+# good on every objective, the whole branch is dropped. Frontier changes are yielded as they happen, so that a UI can show progress
+
+from totk_cook_logic import TotKCookSim
+from totk_cook_space import MAX_POT_SIZE, OBJECTIVES, FailureLock, ObjectiveBound, cook_outcome, inventory_counts, objective_value
+
+def _dominates(a, b):
+
+    """Returns whether values a are at least as good as values b on every objective."""
+
+    return all(x >= y for x, y in zip(a, b))
+
+def iter_pareto(effect = None, objectives = OBJECTIVES, inventory = None, sim = None, max_size = MAX_POT_SIZE):
+
+    """Searches the Pareto-optimal pots for the given objectives (see totk_cook_space.OBJECTIVES), effect level and duration being
+    those of effect. inventory (list of materials, or dictionary of material -> amount) limits the pots to what it holds. Yields every
+    change of the frontier as {'Added': pot, 'Removed': [pots]}, pots being {'Materials', 'Values', 'Output'}. When several pots have
+    the same values, only the first one found is kept."""
+
+    sim = TotKCookSim() if sim is None else sim
+    objectives = list(objectives)
+    bounds = [ObjectiveBound(sim, objective, effect) for objective in objectives]
+
+    counts = None if inventory is None else inventory_counts(sim, inventory)
+    actors = list(sim.material) if counts is None else [actor for actor in sim.material if counts.get(actor, 0) > 0]
+    # materials that bring the most to the objectives first, so that good pots are found early and prune more
+    contributions = {actor: tuple(bound.contribution(sim.material[actor]) for bound in bounds) for actor in actors}
+    # objectives that can't go over their blocked value once a material is in the pot
+    blocked = {actor: tuple(bound.blocks(sim.material[actor]) for bound in bounds) for actor in actors}
+    # objectives are compared relative to the best contribution, so that no objective outweighs the others
+    scales = [max([contributions[actor][i] for actor in actors] + [0]) or 1 for i in range(len(bounds))]
+    candidates = sorted(actors, key = lambda actor: -sum(0 if blocked[actor][i] else contributions[actor][i] / scales[i] for i in range(len(bounds))))
+    # best contribution of every objective among the candidates from each position on
+    suffix_best = [(0,) * len(bounds)] * (len(candidates) + 1)
+    for position in range(len(candidates) - 1, -1, -1):
+        suffix_best[position] = tuple(max(a, b) for a, b in zip(suffix_best[position + 1], contributions[candidates[position]]))
+    lock = FailureLock(sim)
+
+    frontier = []
+
+    def search(start, pot, totals, blocks, slots_left, stuck):
+        for position in range(start, len(candidates)):
+            actor = candidates[position]
+            if counts is not None and pot.count(actor) >= counts[actor]:
+                continue
+            child_totals = tuple(total + contribution for total, contribution in zip(totals, contributions[actor]))
+            child_blocks = tuple(a or b for a, b in zip(blocks, blocked[actor]))
+            # best values this pot and its extensions (with materials from this position on) could reach
+            best_case = tuple(bound.blocked if block else bound.cap(total + (slots_left - 1) * best)
+                              for bound, total, block, best in zip(bounds, child_totals, child_blocks, suffix_best[position]))
+            if any(_dominates(item['Values'], best_case) for item in frontier):
+                continue
+
+            child = pot + [actor]
+            if stuck is not None and not lock.can_escape(stuck, actor):
+                # the pot still fails and scores at most the blocked values, its extensions may not
+                child_stuck = lock.extend(stuck, actor)
+                if any(_dominates(item['Values'], tuple(bound.blocked for bound in bounds)) for item in frontier):
+                    if slots_left > 1:
+                        yield from search(position, child, child_totals, child_blocks, slots_left - 1, child_stuck)
+                    continue
+            outcome = cook_outcome(sim, child)
+            child_stuck = lock.stuck_state()
+            values = tuple(objective_value(outcome, objective, effect) for objective in objectives)
+            if not any(_dominates(item['Values'], values) for item in frontier):
+                removed = [item for item in frontier if _dominates(values, item['Values'])]
+                frontier[:] = [item for item in frontier if not _dominates(values, item['Values'])]
+                added = {'Materials': child, 'Values': values, 'Output': outcome['Output']}
+                frontier.append(added)
+                yield {'Added': added, 'Removed': removed}
+            if slots_left > 1:
+                yield from search(position, child, child_totals, child_blocks, slots_left - 1, child_stuck)
+
+    yield from search(0, [], (0,) * len(bounds), (False,) * len(bounds), max_size, None)
+
+def pareto_frontier(effect = None, objectives = OBJECTIVES, inventory = None, sim = None, max_size = MAX_POT_SIZE):
+
+    """Returns the Pareto-optimal pots (see iter_pareto), values being given as dictionaries of objective -> value, sorted by the
+    first objective, best first."""
+
+    frontier = []
+    for update in iter_pareto(effect, objectives, inventory, sim, max_size):
+        frontier = [item for item in frontier if not any(item is removed for removed in update['Removed'])]
+        frontier.append(update['Added'])
+    objectives = list(objectives)
+    return [dict(item, Values = dict(zip(objectives, item['Values']))) for item in sorted(frontier, key = lambda item: [-value for value in item['Values']])]
+
+if __name__ == "__main__":
+    for item in pareto_frontier('ResistCold', ['hearts', 'duration', 'price'], max_size = 2):
+        print(item['Values'], item['Materials'])
@@ -0,0 +1,206 @@
+# dense numbering of canonical pots, and fixed-width result files addressed by that number
+# a pot of k materials is a multiset of k material indices (MaterialData.json order); sorted, it maps to a strictly increasing
+# combination (a_i + i), which the combinatorial number system numbers as sum(C(c_i, i)). Pots of 1 material come first, then pots of 2,
+# and so on, so every pot of up to max_size materials gets its own rank and no key needs to be stored next to its result
+
+import bisect
+import json
+import math
+import mmap
+import os
+import struct
+
+from totk_cook_logic import FAILURE_RECIPE, TotKCookSim
+from totk_cook_space import MAX_POT_SIZE, cook_outcome, iter_pots, material_actors, resolve_material
+
+MAGIC = b'TKRK'
+VERSION = 1
+# magic, version, material count, max pot size, header length
+PREFIX = struct.Struct('<4sIIII')
+# valid, effect, meal, effect level, effect time, sell price, health recovery, critical rate
+RECORD = struct.Struct('<BbHhhiff')
+
+class InvalidPotException(Exception):
+    pass
+
+class PotIndexer():
+
+    """Ranks and unranks canonical pots of up to max_size materials among material_count."""
+
+    def __init__(self, material_count, max_size = MAX_POT_SIZE):
+
+        self.material_count = material_count
+        self.max_size = max_size
+        # binomials[i][c] = C(c, i), for every c a combination value can take
+        top = material_count + max_size
+        self._binomials = [[math.comb(c, i) for c in range(top)] for i in range(max_size + 1)]
+        # first rank of each pot size
+        self._offsets = [0, 0]
+        for size in range(1, max_size + 1):
+            self._offsets.append(self._offsets[-1] + math.comb(material_count + size - 1, size))
+        self.count = self._offsets[-1]
+
+    def rank(self, pot):
+
+        """Returns the rank of a pot given as material indices (in any order)."""
+
+        pot = sorted(pot)
+        if not 1 <= len(pot) <= self.max_size:
+            raise InvalidPotException(f'Pots hold 1 to {self.max_size} materials')
+        if pot[0] < 0 or pot[-1] >= self.material_count:
+            raise InvalidPotException(f'Invalid material index in {pot}')
+        rank = self._offsets[len(pot)]
+        for i, index in enumerate(pot):
+            rank += self._binomials[i + 1][index + i]
+        return rank
+
+    def unrank(self, rank):
+
+        """Returns the pot (sorted tuple of material indices) of a rank."""
+
+        if not 0 <= rank < self.count:
+            raise InvalidPotException(f'Rank out of range: {rank}')
+        size = bisect.bisect_right(self._offsets, rank) - 1
+        rank -= self._offsets[size]
+        pot = []
+        for i in range(size, 0, -1):
+            # largest combination value whose binomial fits in what's left of the rank
+            c = bisect.bisect_right(self._binomials[i], rank) - 1
+            rank -= self._binomials[i][c]
+            pot.append(c - (i - 1))
+        return tuple(reversed(pot))
+
+def _meal_names(sim):
+
+    """Every meal a cook can result in."""
+
+    meals = [FAILURE_RECIPE['ResultActorName']]
+    for recipe in list(sim.recipes) + list(sim.recipes_single):
+        if recipe['ResultActorName'] not in meals:
+            meals.append(recipe['ResultActorName'])
+    return meals
+
+def create_rank_file(path, sim = None, max_size = MAX_POT_SIZE):
+
+    """Creates an empty result file holding one record per rank (the file is sparse, records are only written by fill_rank_file)."""
+
+    sim = TotKCookSim() if sim is None else sim
+    actors = material_actors(sim)
+    indexer = PotIndexer(len(actors), max_size)
+    header = json.dumps({'materials': actors, 'meals': _meal_names(sim), 'effects': list(sim.effect)}).encode('UTF-8')
+    header += b' ' * (-(PREFIX.size + len(header)) % 8)
+    with open(path, 'wb') as file:
+        file.write(PREFIX.pack(MAGIC, VERSION, len(actors), max_size, len(header)) + header)
+        file.truncate(PREFIX.size + len(header) + indexer.count * RECORD.size)
+
+def fill_rank_file(path, sim = None, materials = None, start = 0, stop = None):
+
+    """Cooks pots and writes their records in a file made by create_rank_file: every pot made of the given materials (actor names) if
+    materials is given, else every pot whose rank is in [start, stop). Returns the number of records written."""
+
+    sim = TotKCookSim() if sim is None else sim
+    with RankFile(path, writable = True) as rank_file:
+        actors = rank_file.materials
+        if actors != material_actors(sim):
+            raise InvalidPotException('The file was created for other material data')
+        meals = {meal: i for i, meal in enumerate(rank_file.meals)}
+        effects = {effect: i for i, effect in enumerate(rank_file.effects)}
+        indexer = rank_file.indexer
+
+        if materials is not None:
+            indices = sorted(actors.index(actor) for actor in materials)
+            pots = (tuple(indices[i] for i in pot) for pot in iter_pots(len(indices), indexer.max_size))
+        else:
+            stop = indexer.count if stop is None else min(stop, indexer.count)
+            pots = (indexer.unrank(rank) for rank in range(start, stop))
+
+        count = 0
+        for pot in pots:
+            outcome = cook_outcome(sim, [actors[i] for i in pot])
+            effect = outcome['Effect']
+            rank_file._write(indexer.rank(pot), RECORD.pack(
+                1,
+                -1 if effect is None else effects[effect],
+                meals[outcome['ResultActorName']],
+                int(outcome['EffectLevel']),
+                int(outcome['EffectTime']),
+                outcome['SellingPrice'],
+                outcome['HitPointRecover'],
+                outcome['SuperSuccessRate']
+            ))
+            count += 1
+        return count
+
+class RankFile():
+
+    """Memory-mapped result file, records are read directly at their rank."""
+
+    def __init__(self, path, writable = False):
+
+        self._file = open(path, 'r+b' if writable else 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        magic, version, material_count, max_size, header_size = PREFIX.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise InvalidPotException('Not a rank file')
+        header = json.loads(self._map[PREFIX.size:PREFIX.size + header_size].decode('UTF-8'))
+        self.materials = header['materials']
+        self.meals = header['meals']
+        self.effects = header['effects']
+        self.indexer = PotIndexer(material_count, max_size)
+        self._records = PREFIX.size + header_size
+        self._material_index = {actor: i for i, actor in enumerate(self.materials)}
+
+    def _write(self, rank, record):
+
+        self._map[self._records + rank * RECORD.size:self._records + (rank + 1) * RECORD.size] = record
+
+    def record(self, rank):
+
+        """Returns the record of a rank, or None if it wasn't filled."""
+
+        valid, effect, meal, level, time, price, hearts, critical_rate = RECORD.unpack_from(self._map, self._records + rank * RECORD.size)
+        if not valid:
+            return None
+        return {
+            'ResultActorName': self.meals[meal],
+            'Effect': None if effect < 0 else self.effects[effect],
+            'EffectLevel': level,
+            'EffectTime': time,
+            'HitPointRecover': hearts,
+            'SellingPrice': price,
+            'SuperSuccessRate': critical_rate
+        }
+
+    def lookup(self, materials, sim = None):
+
+        """Returns the record of a pot given by actor names, or by material names (in any language) if a simulator is given to resolve
+        them. Returns None if the pot wasn't filled."""
+
+        indices = []
+        for name in materials:
+            actor = resolve_material(sim, name) if sim is not None else name
+            if actor not in self._material_index:
+                raise InvalidPotException(f'Invalid material: {name}')
+            indices.append(self._material_index[actor])
+        return self.record(self.indexer.rank(indices))
+
+    def close(self):
+
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *args):
+
+        self.close()
+
+if __name__ == "__main__":
+    sim = TotKCookSim()
+    if not os.path.exists('Results.rank'):
+        create_rank_file('Results.rank', sim, max_size = 3)
+    fill_rank_file('Results.rank', sim, materials = material_actors(sim)[:40])
+    with RankFile('Results.rank') as rank_file:
+        print(rank_file.lookup(['Hot-Footed Frog', 'Hot-Footed Frog', 'Hightail Lizard'], sim))
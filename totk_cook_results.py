@@ -0,0 +1,365 @@
+# columnar store of precomputed cooking results, and a query engine over it
+# results are written by chunks of fixed row count, one binary file per chunk holding one array per column, described by a manifest
+# (column layout, min/max of every column in every chunk, material and meal tables) so that queries can skip chunks and stream the rest
+
+import array
+import heapq
+import json
+import operator
+import os
+
+from totk_cook_logic import TotKCookSim
+from totk_cook_space import MAX_POT_SIZE, cook_outcome, iter_pots, material_actors, pot_count
+
+MANIFEST_NAME = 'manifest.json'
+
+# column name -> array typecode
+COLUMNS = {
+    'meal': 'h',
+    'effect': 'b',
+    'level': 'h',
+    'time': 'i',
+    # Hearts of totk_cook_space.cook_outcome (what the hearts objective ranks), and the HitPointRecover of the meal
+    'hearts': 'f',
+    'hit_points': 'f',
+    'price': 'i',
+    'critical_rate': 'f',
+    'm0': 'h',
+    'm1': 'h',
+    'm2': 'h',
+    'm3': 'h',
+    'm4': 'h'
+}
+MATERIAL_COLUMNS = ['m0', 'm1', 'm2', 'm3', 'm4']
+# column -> field of the formatted rows
+ORDER_FIELDS = {'level': 'EffectLevel', 'time': 'EffectTime', 'hearts': 'Hearts', 'hit_points': 'HitPointRecover',
+                'price': 'SellingPrice', 'critical_rate': 'SuperSuccessRate'}
+
+# filter operators
+OPERATORS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    'in': lambda a, b: a in b
+}
+
+class InvalidQueryException(Exception):
+    pass
+
+class ResultStoreWriter():
+
+    """Writes simulator results into a store directory, chunk by chunk."""
+
+    def __init__(self, path, materials, chunk_size = 65536):
+
+        self.path = path
+        self.chunk_size = chunk_size
+        self._manifest = {
+            'columns': COLUMNS,
+            'chunk_size': chunk_size,
+            # full records, so that queries can filter on any material property
+            'materials': materials,
+            'meals': [],
+            'effects': [],
+            'chunks': []
+        }
+        self._meals = {}
+        self._effects = {}
+        self._reset_chunk()
+        os.makedirs(path, exist_ok = True)
+
+    def _reset_chunk(self):
+
+        self._columns = {name: array.array(typecode) for name, typecode in COLUMNS.items()}
+        self._rows = 0
+
+    def _code(self, table, index, value):
+
+        if value not in index:
+            index[value] = len(table)
+            table.append(value)
+        return index[value]
+
+    def add(self, pot, outcome):
+
+        """Adds one row: the pot (material indices) and its outcome (see totk_cook_space.cook_outcome)."""
+
+        columns = self._columns
+        columns['meal'].append(self._code(self._manifest['meals'], self._meals, outcome['ResultActorName']))
+        effect = outcome['Effect']
+        columns['effect'].append(-1 if effect is None else self._code(self._manifest['effects'], self._effects, effect))
+        columns['level'].append(int(outcome['EffectLevel']))
+        columns['time'].append(int(outcome['EffectTime']))
+        columns['hearts'].append(outcome['Hearts'])
+        columns['hit_points'].append(outcome['HitPointRecover'])
+        columns['price'].append(outcome['SellingPrice'])
+        columns['critical_rate'].append(outcome['SuperSuccessRate'])
+        for slot, name in enumerate(MATERIAL_COLUMNS):
+            columns[name].append(pot[slot] if slot < len(pot) else -1)
+        self._rows += 1
+        if self._rows >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+
+        """Writes the current chunk to disk."""
+
+        if not self._rows:
+            return
+        chunk = {'file': 'chunk_{:05d}.bin'.format(len(self._manifest['chunks'])), 'rows': self._rows, 'offsets': {}, 'stats': {}}
+        with open(os.path.join(self.path, chunk['file']), 'wb') as file:
+            for name, values in self._columns.items():
+                chunk['offsets'][name] = file.tell()
+                values.tofile(file)
+                chunk['stats'][name] = [min(values), max(values)]
+        self._manifest['chunks'].append(chunk)
+        self._reset_chunk()
+
+    def close(self):
+
+        """Writes the last chunk and the manifest."""
+
+        self.flush()
+        with open(os.path.join(self.path, MANIFEST_NAME), 'w', encoding = 'UTF-8') as file:
+            json.dump(self._manifest, file)
+
+def write_results(path, sim = None, materials = None, max_size = MAX_POT_SIZE, chunk_size = 65536):
+
+    """Cooks every canonical pot made of the given materials (actor names, all materials if None) and writes the results to a store.
+    Returns the number of rows written."""
+
+    sim = TotKCookSim() if sim is None else sim
+    actors = material_actors(sim) if materials is None else list(materials)
+    writer = ResultStoreWriter(path, [dict(sim.material[actor]) for actor in actors], chunk_size)
+    for pot in iter_pots(len(actors), max_size):
+        writer.add(pot, cook_outcome(sim, [actors[i] for i in pot]))
+    writer.close()
+    return pot_count(len(actors), max_size)
+
+class ResultStore():
+
+    """Read side of a store written by ResultStoreWriter."""
+
+    def __init__(self, path):
+
+        self.path = path
+        with open(os.path.join(path, MANIFEST_NAME), 'r', encoding = 'UTF-8') as file:
+            self.manifest = json.loads(file.read())
+        if self.manifest['columns'] != COLUMNS:
+            raise InvalidQueryException(f'Store written with other columns, it has to be written again: {path}')
+        self.materials = self.manifest['materials']
+        self.meals = self.manifest['meals']
+        self.effects = self.manifest['effects']
+        # whole columns read from chunks, and single values read for the rows returned by queries
+        self.column_reads = 0
+        self.value_reads = 0
+
+    def __len__(self):
+
+        return sum(chunk['rows'] for chunk in self.manifest['chunks'])
+
+    def _read_chunk(self, chunk, names):
+
+        """Reads the given columns of a chunk."""
+
+        columns = {}
+        with open(os.path.join(self.path, chunk['file']), 'rb') as file:
+            for name in names:
+                values = array.array(self.manifest['columns'][name])
+                file.seek(chunk['offsets'][name])
+                values.fromfile(file, chunk['rows'])
+                columns[name] = values
+                self.column_reads += 1
+        return columns
+
+    def _read_rows(self, chunk, names, rows):
+
+        """Reads the given columns of a few rows of a chunk, returns column -> row -> value."""
+
+        columns = {}
+        with open(os.path.join(self.path, chunk['file']), 'rb') as file:
+            for name in names:
+                typecode = self.manifest['columns'][name]
+                itemsize = array.array(typecode).itemsize
+                columns[name] = {}
+                for row in rows:
+                    values = array.array(typecode)
+                    file.seek(chunk['offsets'][name] + row * itemsize)
+                    values.fromfile(file, 1)
+                    columns[name][row] = values[0]
+                    self.value_reads += 1
+        return columns
+
+    def _encode_filters(self, filters):
+
+        """Checks filters and translates meal and effect names to the codes stored in the columns."""
+
+        encoded = []
+        for column, op, value in filters:
+            if column not in self.manifest['columns']:
+                raise InvalidQueryException(f'Unknown column: {column}')
+            if op not in OPERATORS:
+                raise InvalidQueryException(f'Unknown operator: {op}')
+            if column in ['meal', 'effect']:
+                table = self.meals if column == 'meal' else self.effects
+                def code(name):
+                    if name is None and column == 'effect':
+                        return -1
+                    # unknown names can't match anything
+                    return table.index(name) if name in table else -2
+                value = set(code(name) for name in value) if op == 'in' else code(value)
+            encoded.append((column, OPERATORS[op], value))
+        return encoded
+
+    def _chunk_may_match(self, chunk, filters):
+
+        """Uses the min/max of the chunk columns to rule out chunks where a filter can't match."""
+
+        for column, op, value in filters:
+            low, high = chunk['stats'][column]
+            if op is operator.eq and not low <= value <= high:
+                return False
+            if op is operator.ge and high < value:
+                return False
+            if op is operator.gt and high <= value:
+                return False
+            if op is operator.le and low > value:
+                return False
+            if op is operator.lt and low >= value:
+                return False
+        return True
+
+    def _allowed_materials(self, material_filters):
+
+        """Returns the set of material indices whose properties satisfy every material filter (None if no filter)."""
+
+        if not material_filters:
+            return None
+        allowed = set()
+        for i, material in enumerate(self.materials):
+            ok = True
+            for field, op, value in material_filters:
+                if op not in OPERATORS:
+                    raise InvalidQueryException(f'Unknown operator: {op}')
+                if field not in material or not OPERATORS[op](material[field], value):
+                    ok = False
+                    break
+            if ok:
+                allowed.add(i)
+        # empty slots are always fine
+        allowed.add(-1)
+        return allowed
+
+    def _rows(self, hits, columns_read):
+
+        """Formats rows given as (chunk, row), reading the columns that the query didn't already read (columns_read: (chunk file,
+        row) -> column -> value) for those rows only."""
+
+        by_chunk = {}
+        for chunk, row in hits:
+            by_chunk.setdefault(chunk['file'], (chunk, []))[1].append(row)
+        values = {}
+        for chunk, rows in by_chunk.values():
+            missing = [name for name in COLUMNS if name not in columns_read[(chunk['file'], rows[0])]]
+            read = self._read_rows(chunk, missing, rows)
+            for row in rows:
+                row_values = dict(columns_read[(chunk['file'], row)])
+                row_values.update((name, read[name][row]) for name in missing)
+                values[(chunk['file'], row)] = row_values
+        return [self._row({name: {0: value} for name, value in values[(chunk['file'], row)].items()}, 0) for chunk, row in hits]
+
+    def _row(self, columns, row):
+
+        """Formats one row of a chunk."""
+
+        effect = columns['effect'][row]
+        return {
+            'Materials': [self.materials[columns[name][row]]['ActorName'] for name in MATERIAL_COLUMNS if columns[name][row] >= 0],
+            'ResultActorName': self.meals[columns['meal'][row]],
+            'Effect': None if effect < 0 else self.effects[effect],
+            'EffectLevel': columns['level'][row],
+            'EffectTime': columns['time'][row],
+            'Hearts': columns['hearts'][row],
+            'HitPointRecover': columns['hit_points'][row],
+            'SellingPrice': columns['price'][row],
+            'SuperSuccessRate': columns['critical_rate'][row]
+        }
+
+    def query(self, filters = (), material_filters = (), order_by = None, descending = True, k = 20):
+
+        """Returns up to k rows matching every filter, as dictionaries.
+        filters are (column, operator, value) tuples on the result columns (meal and effect are given by name), e.g. ('level', '>=', 2).
+        material_filters are (field, operator, value) tuples on MaterialData properties, that every material of the pot must satisfy,
+        e.g. ('BuyingPrice', '<=', 20).
+        If order_by is a column, the top k rows by that column are returned, otherwise the first k matching rows."""
+
+        filters = self._encode_filters(filters)
+        allowed = self._allowed_materials(material_filters)
+        if order_by is not None and order_by not in self.manifest['columns']:
+            raise InvalidQueryException(f'Unknown column: {order_by}')
+        if k <= 0:
+            return []
+
+        chunks = [chunk for chunk in self.manifest['chunks'] if self._chunk_may_match(chunk, filters)]
+        if order_by is not None:
+            # chunks holding the best values come first, so that the top k fills up early and remaining chunks can be skipped
+            sign = 1 if descending else -1
+            chunks.sort(key = lambda chunk: sign * chunk['stats'][order_by][1 if descending else 0], reverse = True)
+
+        # only the columns the filters and the order need are read whole, the others are read for the returned rows only
+        names = set(name for name, _, _ in filters)
+        if order_by is not None:
+            names.add(order_by)
+        if allowed is not None:
+            names.update(MATERIAL_COLUMNS)
+        names = [name for name in COLUMNS if name in names]
+        # values already read of the rows that entered the results, (chunk file, row) -> column -> value
+        columns_read = {}
+        # heap of (sort key, sequence number, chunk, row), worst row on top
+        top = []
+        found = []
+        sequence = 0
+        for chunk in chunks:
+            if order_by is not None and len(top) >= k:
+                best_in_chunk = sign * chunk['stats'][order_by][1 if descending else 0]
+                if best_in_chunk <= top[0][0]:
+                    # chunks are sorted, nothing left can enter the top k
+                    break
+            columns = self._read_chunk(chunk, names)
+            for row in range(chunk['rows']):
+                if any(not op(columns[column][row], value) for column, op, value in filters):
+                    continue
+                if allowed is not None and any(columns[name][row] not in allowed for name in MATERIAL_COLUMNS):
+                    continue
+                if order_by is None:
+                    columns_read[(chunk['file'], row)] = {name: columns[name][row] for name in names}
+                    found.append((chunk, row))
+                    if len(found) >= k:
+                        return self._rows(found, columns_read)
+                    continue
+                key = sign * columns[order_by][row]
+                if len(top) < k:
+                    heapq.heappush(top, (key, sequence, chunk, row))
+                elif key > top[0][0]:
+                    heapq.heapreplace(top, (key, sequence, chunk, row))
+                else:
+                    continue
+                columns_read[(chunk['file'], row)] = {name: columns[name][row] for name in names}
+                sequence += 1
+
+        if order_by is None:
+            return self._rows(found, columns_read)
+        hits = [(chunk, row) for _, _, chunk, row in sorted(top, key = lambda item: (-item[0], item[1]))]
+        return self._rows(hits, columns_read)
+
+if __name__ == "__main__":
+    sim = TotKCookSim()
+    # small example: every pot made of materials that can be bought for 20 rupees or less
+    cheap = [actor for actor in material_actors(sim) if sim.material[actor].get('BuyingPrice', 0) <= 20]
+    write_results('Results', sim, cheap[:30], max_size = 3)
+    store = ResultStore('Results')
+    for row in store.query([('effect', '==', 'ResistHot'), ('level', '>=', 2)], [('BuyingPrice', '<=', 20)], order_by = 'hearts'):
+        print(row)
@@ -0,0 +1,174 @@
+# cheapest pots to buy for a target dish: minimum values of some objectives (e.g. ResistCold level 2 and 600 seconds, or 80 quarter
+# hearts), materials costing their BuyingPrice, except the ones already in the inventory
+# pots are searched best-first by a lower bound of their cost: the cost of the materials already in the pot, plus the most of
+# - the cheapest remaining material for every material still needed
+# - for every objective, the cheapest way to fill the slots left with remaining materials whose contributions add up to what is still
+#   missing, when materials can be taken in fractions (a linear relaxation, solved with the lower convex hull of price as a function
+#   of contribution)
+# the per-material contributions of totk_cook_space.ObjectiveBound tell how many more materials a pot needs at least to reach the
+# target, and drop pots that can't reach it however they are completed
+
+import bisect
+import heapq
+import itertools
+
+from totk_cook_logic import TotKCookSim
+from totk_cook_space import MAX_POT_SIZE, FailureLock, ObjectiveBound, cook_outcome, inventory_counts, objective_value
+
+def pot_purchase(sim, pot, counts = None):
+
+    """Returns the materials of a pot that have to be bought (actor name -> amount) when the inventory holds counts (actor name ->
+    amount), and their cost."""
+
+    buy = {}
+    for actor in pot:
+        buy[actor] = buy.get(actor, 0) + 1
+    if counts is not None:
+        buy = {actor: amount - counts.get(actor, 0) for actor, amount in buy.items()}
+    buy = {actor: amount for actor, amount in buy.items() if amount > 0}
+    return buy, sum(sim.material[actor].get('BuyingPrice', 0) * amount for actor, amount in buy.items())
+
+def _lower_hull(points):
+
+    """Returns the lower convex hull of (contribution, price) points, by increasing contribution."""
+
+    hull = []
+    for point in sorted(points):
+        if hull and hull[-1][0] == point[0]:
+            # same contribution, the cheapest point came first
+            continue
+        while len(hull) >= 2 and ((hull[-1][0] - hull[-2][0]) * (point[1] - hull[-2][1])
+                                  <= (hull[-1][1] - hull[-2][1]) * (point[0] - hull[-2][0])):
+            hull.pop()
+        hull.append(point)
+    return hull
+
+def _hull_price(hull, contribution):
+
+    """Returns the price of a contribution on a lower hull, by linear interpolation (the contribution is within the hull)."""
+
+    i = bisect.bisect_left(hull, (contribution, -1))
+    if i == 0:
+        return hull[0][1]
+    (x0, y0), (x1, y1) = hull[i - 1], hull[min(i, len(hull) - 1)]
+    if x1 == x0:
+        return y1
+    return y0 + (y1 - y0) * (contribution - x0) / (x1 - x0)
+
+def iter_cheapest_pots(target, effect = None, inventory = None, sim = None, max_size = MAX_POT_SIZE):
+
+    """Yields the pots (up to max_size materials) whose cook outcome reaches target (objective -> minimum value, see
+    totk_cook_space.OBJECTIVES), cheapest first. If effect is given, the meal must have that effect, and effect level and duration
+    are those of effect. Materials of the inventory (list of materials, or dictionary of material -> amount) cost nothing, others cost
+    their BuyingPrice. Pots are {'Materials', 'Buy', 'Cost', 'Values', 'Output'}, Buy being actor name -> amount to buy."""
+
+    sim = TotKCookSim() if sim is None else sim
+    objectives = list(target)
+    minimums = [target[objective] for objective in objectives]
+    bounds = [ObjectiveBound(sim, objective, effect) for objective in objectives]
+    counts = None if inventory is None else inventory_counts(sim, inventory)
+
+    # a material with another effect makes the meal lose the wanted one, materials that block an objective keep it under the target
+    candidates = list(sim.material)
+    if effect is not None:
+        candidates = [actor for actor in candidates if sim.material[actor].get('CureEffectType', effect) == effect]
+    candidates = [actor for actor in candidates
+                  if not any(bound.blocks(sim.material[actor]) and bound.blocked < minimum for bound, minimum in zip(bounds, minimums))]
+    contributions = {actor: tuple(bound.contribution(sim.material[actor]) for bound in bounds) for actor in candidates}
+    # lowest price a material can cost, for the cost bound
+    prices = {actor: 0 if counts is not None and counts.get(actor, 0) > 0 else sim.material[actor].get('BuyingPrice', 0)
+              for actor in candidates}
+    candidates.sort(key = lambda actor: prices[actor])
+    required = [bound.required(minimum) for bound, minimum in zip(bounds, minimums)]
+    # best contribution of every objective, cheapest price, and lower hull of price against contribution of every objective (an empty
+    # slot being a contribution of 0 for free), among the candidates from each position on
+    suffix_best = [(0,) * len(bounds)] * (len(candidates) + 1)
+    suffix_price = [0] * (len(candidates) + 1)
+    suffix_hulls = [None] * len(candidates)
+    for position in range(len(candidates) - 1, -1, -1):
+        actor = candidates[position]
+        suffix_best[position] = tuple(max(a, b) for a, b in zip(suffix_best[position + 1], contributions[actor]))
+        suffix_price[position] = prices[actor]
+        suffix_hulls[position] = [_lower_hull([(0, 0)] + [(contributions[other][i], prices[other]) for other in candidates[position:]])
+                                  for i in range(len(bounds))]
+    lock = FailureLock(sim)
+
+    def materials_needed(totals, position, slots_left):
+        # fewest materials to add (from position on) before the bounds reach the target, None if they never do
+        for amount in range(slots_left + 1):
+            if all(bound.cap(total + amount * best) >= minimum
+                   for bound, total, best, minimum in zip(bounds, totals, suffix_best[position], minimums)):
+                return amount
+        return None
+
+    def cost_bound(cost, totals, position, needed, slots_left):
+        bound = needed * suffix_price[position]
+        for total, minimum, hull in zip(totals, required, suffix_hulls[position]):
+            if total < minimum and slots_left > 0:
+                # materials_needed already checked that the slots left can bring the missing contribution
+                missing = min(minimum - total, slots_left * hull[-1][0])
+                bound = max(bound, slots_left * _hull_price(hull, missing / slots_left))
+        return cost + bound
+
+    def push_children(pot, cost, totals, position, stuck):
+        # the children of a pot are added to the heap one at a time, from position on: the entry stands for all of them, with the
+        # bound of the pot when completed with those materials, which is no more than the bound of any of them
+        slots_left = max_size - len(pot)
+        if slots_left == 0 or position >= len(candidates):
+            return
+        needed = materials_needed(totals, position, slots_left)
+        if needed is None:
+            return
+        bound = cost_bound(cost, totals, position, max(needed, 1), slots_left)
+        heapq.heappush(heap, (bound, True, -len(pot), next(order), pot, cost, totals, position, stuck))
+
+    # (cost bound, whether the entry stands for the children of the pot, minus the pot size, tie breaker, pot, its cost, its
+    # contribution totals, position of its last material or of the next child, stuck state of the pot if it is known to fail, see
+    # FailureLock)
+    # for the same bound, pots come before children and bigger pots first, so that pots reaching the target are found early
+    order = itertools.count()
+    heap = []
+    push_children([], 0, (0,) * len(bounds), 0, None)
+
+    while heap:
+        _, children, _, _, pot, cost, totals, position, stuck = heapq.heappop(heap)
+        if children:
+            push_children(pot, cost, totals, position + 1, stuck)
+            actor = candidates[position]
+            # a child that can't change the failure recipe of the pot still fails, it is extended without being cooked
+            child_stuck = lock.extend(stuck, actor) if stuck is not None and not lock.can_escape(stuck, actor) else None
+            child_totals = tuple(total + contribution for total, contribution in zip(totals, contributions[actor]))
+            slots_left = max_size - len(pot) - 1
+            needed = materials_needed(child_totals, position, slots_left)
+            if needed is None:
+                continue
+            # the material is free as long as the inventory holds more of it than the pot
+            free = counts is not None and pot.count(actor) < counts.get(actor, 0)
+            child_cost = cost + (0 if free else sim.material[actor].get('BuyingPrice', 0))
+            bound = cost_bound(child_cost, child_totals, position, needed, slots_left)
+            heapq.heappush(heap, (bound, False, -len(pot) - 1, next(order), pot + [actor], child_cost, child_totals, position, child_stuck))
+            continue
+
+        if stuck is not None and any(bound.blocked < minimum for bound, minimum in zip(bounds, minimums)):
+            # the pot fails and scores at most the blocked values, under the target
+            push_children(pot, cost, totals, position, stuck)
+            continue
+        outcome = cook_outcome(sim, pot)
+        values = tuple(objective_value(outcome, objective, effect) for objective in objectives)
+        push_children(pot, cost, totals, position, lock.stuck_state())
+        if all(value >= minimum for value, minimum in zip(values, minimums)) and (effect is None or outcome['Effect'] == effect):
+            # the bound of a pot reaching the target is its cost, so no pot left in the heap is cheaper
+            buy = pot_purchase(sim, pot, counts)[0]
+            yield {'Materials': pot, 'Buy': buy, 'Cost': cost, 'Values': dict(zip(objectives, values)), 'Output': outcome['Output']}
+
+def shopping_list(target, effect = None, inventory = None, sim = None, max_size = MAX_POT_SIZE, count = 5):
+
+    """Returns the count cheapest pots reaching target (see iter_cheapest_pots)."""
+
+    return list(itertools.islice(iter_cheapest_pots(target, effect, inventory, sim, max_size), count))
+
+if __name__ == "__main__":
+    for item in shopping_list({'level': 2, 'duration': 600}, 'ResistCold'):
+        print(item['Cost'], item['Buy'], item['Values'])
+    for item in shopping_list({'hearts': 80}):
+        print(item['Cost'], item['Buy'], item['Values'])
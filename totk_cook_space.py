@@ -0,0 +1,311 @@
+# helpers shared by everything that walks the cooking space: canonical pots (multisets of up to 5 materials, in MaterialData.json
+# order) and the numeric outcome of a cook, before it gets formatted into strings by TotKCookSim._finish
+
+import itertools
+import math
+
+from totk_cook_logic import InvalidMaterialException
+
+# a pot holds at most 5 materials
+MAX_POT_SIZE = 5
+
+def material_actors(sim):
+
+    """Returns the actor names of all materials, in MaterialData.json order (the order used to number materials everywhere)."""
+
+    return list(sim.material)
+
+def resolve_material(sim, name):
+
+    """Returns the actor name of a material given by its name (in any language) or by its actor name."""
+
+    if name in sim._index_material_name:
+        return sim._index_material_name[name]
+    if name in sim.material:
+        return name
+    raise InvalidMaterialException(f'Invalid material: {name}')
+
+def inventory_counts(sim, inventory):
+
+    """Returns actor name -> available amount, from a list of materials or a dictionary of material -> amount."""
+
+    counts = {}
+    if isinstance(inventory, dict):
+        items = inventory.items()
+    else:
+        items = [(name, 1) for name in inventory]
+    for name, amount in items:
+        actor = resolve_material(sim, name)
+        counts[actor] = counts.get(actor, 0) + amount
+    return counts
+
+def canonical_pot(sim, materials):
+
+    """Returns the canonical form of a pot: tuple of material indices (in MaterialData.json order), sorted."""
+
+    index = {actor: i for i, actor in enumerate(sim.material)}
+    return tuple(sorted(index[resolve_material(sim, name)] for name in materials))
+
+def pot_count(material_count, max_size = MAX_POT_SIZE, min_size = 1):
+
+    """Returns the number of canonical pots made of min_size to max_size materials among material_count."""
+
+    return sum(math.comb(material_count + size - 1, size) for size in range(min_size, max_size + 1))
+
+def iter_pots(material_count, max_size = MAX_POT_SIZE, min_size = 1):
+
+    """Yields every canonical pot (sorted tuple of material indices), by size then in lexicographic order."""
+
+    for size in range(min_size, max_size + 1):
+        yield from itertools.combinations_with_replacement(range(material_count), size)
+
+def cook_outcome(sim, materials):
+
+    """Cooks a list of materials and returns the raw (numeric) meal properties, along with the formatted output."""
+
+    output = sim.cook(list(materials))
+    tmp = sim._tmp
+    return {
+        'ResultActorName': tmp['Recipe']['ResultActorName'],
+        'RecipeNumber': output['Recipe number'],
+        'Effect': tmp.get('Effect'),
+        'EffectLevel': tmp['EffectLevel'],
+        'EffectTime': tmp['EffectTime'],
+        'HitPointRecover': tmp['HitPointRecover'],
+        # Extra Hearts meals fully recover health, whatever their HitPointRecover
+        'Hearts': sim.effect['LifeRecover'].get('MaxLv') if tmp.get('Effect') == 'LifeMaxUp' else tmp['HitPointRecover'],
+        'SellingPrice': tmp['SellingPrice'],
+        'SuperSuccessRate': min(tmp['SuperSuccessRate'], 100),
+        'CookFailure': tmp['Recipe'].get('CookFailure', False),
+        'Output': output
+    }
+
+# objectives that searches can maximize, read from cook_outcome
+OBJECTIVES = ['hearts', 'level', 'duration', 'price']
+
+# effects whose level is a number of quarter hearts, rounded to whole hearts
+QUARTER_HEART_EFFECTS = ['LifeMaxUp', 'LifeRepair']
+
+class InvalidObjectiveException(Exception):
+    pass
+
+def objective_value(outcome, objective, effect = None):
+
+    """Returns the value of an objective for a cook outcome. Effect level and duration only count for the given effect."""
+
+    if objective == 'hearts':
+        return outcome['Hearts']
+    if objective == 'price':
+        return outcome['SellingPrice']
+    if outcome['Effect'] != effect:
+        return 0
+    if objective == 'level':
+        return outcome['EffectLevel']
+    if objective == 'duration':
+        return outcome['EffectTime']
+    raise InvalidObjectiveException(f'Unknown objective: {objective}')
+
+def doomed_materials(sim, fixed):
+
+    """Returns the actor names of the materials that make every pot holding them cook with a recipe for which fixed(recipe) is true.
+    Recipes match when each of their ingredients is found in the pot, whatever else it holds: a pot of 2+ different materials matches
+    at the latest the first recipe a material fulfills on its own, so if that recipe and all the ones before it are fixed, any such pot
+    is. A pot of that one material uses the single recipes (and fails if none matches)."""
+
+    doomed = set()
+    for actor, material in sim.material.items():
+        tokens = [actor, material['CookTag']]
+        single = next((recipe for recipe in sim.recipes_single if any(token in recipe['Recipe'].split(' or ') for token in tokens)), None)
+        if single is not None and not fixed(single):
+            continue
+        for recipe in sim.recipes:
+            if not fixed(recipe):
+                break
+            and_parts = recipe['Recipe'].split(' + ')
+            if len(and_parts) == 1 and any(token in and_parts[0].split(' or ') for token in tokens):
+                doomed.add(actor)
+                break
+    return doomed
+
+class ObjectiveBound():
+
+    """Upper bound of an objective, computed from per-material contributions: for any pot, objective_value <= cap(sum of the
+    contributions of its materials). Searches add up contributions as they add materials, and prune when even the best remaining
+    materials can't beat what they already found."""
+
+    def __init__(self, sim, objective, effect = None):
+
+        if objective not in OBJECTIVES:
+            raise InvalidObjectiveException(f'Unknown objective: {objective}')
+        if objective in ['level', 'duration'] and effect not in sim.effect:
+            raise InvalidObjectiveException(f'Objective {objective} needs an effect')
+        self.objective = objective
+        self.effect = effect
+        self._sim = sim
+        recipes = list(sim.recipes) + list(sim.recipes_single)
+
+        if objective == 'hearts':
+            # raw health is doubled when cooked, spice health is added once per material type, then the recipe bonus
+            self._extra = max([0] + [recipe.get('BonusHeart', 0) for recipe in recipes])
+            self._full = sim.effect['LifeRecover'].get('MaxLv')
+            # failed meals recover at most SubtleLifeRecover
+            self._floor = max(sim.system_data['SubtleLifeRecover'], sim.system_data['FailLifeRecover'], 1)
+        elif objective == 'level':
+            effect_data = sim.effect[effect]
+            # Extra Hearts and Gloom Recovery round to the nearest whole heart, which can add up to half a heart
+            self._extra = 2 if effect in QUARTER_HEART_EFFECTS else 0
+            self._floor = 4 if effect in QUARTER_HEART_EFFECTS else 1
+            self._max = effect_data.get('MaxLv')
+        elif objective == 'duration':
+            self._extra = max([0] + [recipe.get('BonusTime', 0) for recipe in recipes])
+        else:
+            # the price rate depends on the amount of materials
+            self._rates = {item['MaterialNum']: item['Rate'] for item in sim.system_data['PriceRateList']}
+            self._rate = max(self._rates.values())
+
+        # value of any pot holding a material that blocks the objective (see blocks)
+        if objective == 'hearts':
+            self.blocked = self._floor
+            self._doomed = doomed_materials(sim, lambda recipe: recipe.get('CookFailure', False))
+        else:
+            # failed meals, fairy tonics and rock-hard food sell for 2 rupees and have no effect
+            self.blocked = 2 if objective == 'price' else 0
+            fixed_actors = [sim.system_data['FairyActorName'], 'Item_Cook_O_02']
+            self._doomed = doomed_materials(sim, lambda recipe: recipe.get('CookFailure', False) or recipe['ResultActorName'] in fixed_actors)
+
+    def contribution(self, material):
+
+        """Returns the most a material can add to the objective (before cap)."""
+
+        if self.objective == 'hearts':
+            value = self._sim.system_data['LifeRecoverRate'] * material.get('HitPointRecover', 0) + material.get('SpiceBoostHitPointRecover', 0)
+            if material.get('CureEffectType') == 'LifeMaxUp':
+                # the meal can be an Extra Hearts meal, which fully recovers health
+                value = max(value, 120)
+            return value
+        if self.objective == 'price':
+            return 1 if material.get('CookLowPrice', False) else material.get('SellingPrice', 0)
+        effect_data = self._sim.effect[self.effect]
+        matches = material.get('CureEffectType') == self.effect
+        if self.objective == 'level':
+            value = effect_data.get('Rate', 0) * material.get('CureEffectLevel', 0) if matches else 0
+            if self.effect == 'LifeMaxUp':
+                value += material.get('SpiceBoostMaxHeartLevel', 0)
+            elif self.effect in ['StaminaRecover', 'ExStaminaMaxUp']:
+                value += material.get('SpiceBoostStaminaLevel', 0)
+            return value
+        # every material adds 30 seconds, materials with the effect add its base time, spices add their own time
+        return 30 + (effect_data.get('BaseTime', 0) if matches else 0) + material.get('SpiceBoostEffectiveTime', 0)
+
+    def blocks(self, material):
+
+        """Returns whether any pot holding this material scores at most blocked on the objective: the material dooms the pot to a
+        failed meal (or to a fairy tonic, except for hearts), or has another effect than the one whose level or duration is the
+        objective, and meals with clashing effects have no effect."""
+
+        if material['ActorName'] in self._doomed:
+            return True
+        if self.objective not in ['level', 'duration']:
+            return False
+        return material.get('CureEffectType', self.effect) != self.effect
+
+    def cap(self, total, size = None):
+
+        """Returns the bound of the objective for a pot whose contributions add up to total. The price bound is tighter when the
+        amount of materials of the pot (size) is known."""
+
+        if self.objective == 'hearts':
+            total += self._extra
+            return self._full if total >= 120 else max(total, self._floor)
+        if self.objective == 'level':
+            return min(self._max, max(total + self._extra, self._floor))
+        if self.objective == 'duration':
+            return min(1800, total + self._extra)
+        return max(3, math.floor(total * self._rates.get(size, self._rate)))
+
+    def required(self, minimum):
+
+        """Returns a lower bound of the contributions total of any pot reaching minimum on the objective (the inverse of cap)."""
+
+        if self.objective == 'hearts':
+            if minimum <= self._floor:
+                return 0
+            return max(0, min(minimum, 120) - self._extra)
+        if self.objective == 'level':
+            return 0 if minimum <= self._floor else max(0, minimum - self._extra)
+        if self.objective == 'duration':
+            return max(0, minimum - self._extra)
+        return 0 if minimum <= 3 else minimum / self._rate
+
+class FailureLock():
+
+    """Detects pots stuck on a failure recipe. Recipes are matched on the unique (ActorName, CookTag) pairs of a pot, each ingredient
+    taking the first pair left that fits it. When a pot of 2+ different materials matches a CookFailure recipe of RecipeData.json,
+    a material added at the end of the pot can only change the recipe if it is a new pair that fits the one ingredient missing from
+    a recipe listed before it (with every other ingredient of that recipe taken by the pot). Otherwise the pot still fails, so it
+    scores at most ObjectiveBound.blocked, but its own extensions may not. Searches use this to skip cooking such pots."""
+
+    def __init__(self, sim):
+
+        self._sim = sim
+        self._index = {id(recipe): i for i, recipe in enumerate(sim.recipes)}
+        self._parts = [[and_part.split(' or ') for and_part in recipe['Recipe'].split(' + ')] for recipe in sim.recipes]
+        # escape tokens of the stuck states seen so far
+        self._tokens = {}
+
+    def stuck_state(self):
+
+        """Returns the state of the pot last cooked by the simulator if it is stuck on a failure recipe (see can_escape and extend), or
+        None."""
+
+        tmp = self._sim._tmp
+        recipe = tmp['Recipe']
+        if not recipe.get('CookFailure', False) or id(recipe) not in self._index:
+            return None
+        pairs = self._sim._name_tag_pairs(tmp['Materials'])
+        if len(pairs) < 2:
+            return None
+        return (self._index[id(recipe)], tuple(pairs))
+
+    def _escape_tokens(self, state):
+
+        tokens = self._tokens.get(state)
+        if tokens is None:
+            failure, pairs = state
+            tokens = set()
+            for parts in self._parts[:failure]:
+                if len(parts) > len(pairs) + 1:
+                    continue
+                left = list(pairs)
+                missing = []
+                for or_parts in parts:
+                    match = next((index for index, pair in enumerate(left) if any(token in pair for token in or_parts)), None)
+                    if match is None:
+                        missing.append(or_parts)
+                    else:
+                        left.pop(match)
+                if len(missing) == 1:
+                    tokens.update(missing[0])
+            tokens = frozenset(tokens)
+            self._tokens[state] = tokens
+        return tokens
+
+    def can_escape(self, state, actor):
+
+        """Returns whether adding a material at the end of a stuck pot can change its recipe."""
+
+        material = self._sim.material[actor]
+        if (actor, material['CookTag']) in state[1]:
+            # same pairs, same recipe
+            return False
+        tokens = self._escape_tokens(state)
+        return actor in tokens or material['CookTag'] in tokens
+
+    def extend(self, state, actor):
+
+        """Returns the state of a stuck pot once a material that can't change its recipe is added at the end: it is still stuck."""
+
+        pair = (actor, self._sim.material[actor]['CookTag'])
+        if pair in state[1]:
+            return state
+        return (state[0], state[1] + (pair,))